@@ -0,0 +1,175 @@
+"""Fake OpenAI-compatible chat completion server for offline benchmarks.
+
+Answers ``POST /v1/chat/completions`` in the ReAct format CrewAI agents
+expect: a search action for the first ``--tool-calls`` turns of each
+conversation whose agent has the search tool, then a markdown final answer, cut to the request's
+``max_tokens``. Latency, prompt processing and generation speed, and
+injected 429/503 errors are configurable, and errors are seeded so runs
+are repeatable. Run a second, faster instance to stand in for the fast
+model tier.
+
+    python bench/fake_llm.py --port 9100 --latency 0.5 --token-rate 200 --error-rate 0.05
+
+Point the crew at it with:
+
+    CREW_LLM_MODEL=openai/fake-model CREW_LLM_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=fake
+    CREW_LLM_FAST_MODEL=openai/fake-fast-model CREW_LLM_FAST_BASE_URL=http://127.0.0.1:9101/v1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECTION_TITLES = ("Executive Summary", "Market Analysis", "Business Model", "Risks", "Timeline", "Metrics")
+SEARCH_TOPICS = ("market size", "competitors", "pricing strategy", "customer acquisition cost",
+                 "mvp technology stack", "startup funding sources")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def text_of(content) -> str:
+    """Message content as text; content may be a list of parts."""
+    if isinstance(content, list):
+        return "".join(str(part.get("text") or "") for part in content if isinstance(part, dict))
+    return str(content or "")
+
+
+def final_answer(completion_tokens: int, seed: int) -> str:
+    """A markdown plan of roughly ``completion_tokens`` tokens."""
+    rng = random.Random(seed)
+    words_per_section = max(10, completion_tokens * 3 // 4 // len(SECTION_TITLES))
+    sections = []
+    for title in SECTION_TITLES:
+        words = " ".join(rng.choice(("market", "customers", "growth", "revenue", "pilot", "launch",
+                                     "pricing", "team", "channel", "retention", "cost", "risk"))
+                         for _ in range(words_per_section))
+        sections.append(f"## {title}\n\n- Month {rng.randint(1, 12)}: {words.capitalize()}.\n")
+    return "\n".join(sections)
+
+
+class FakeLLM:
+    def __init__(self, latency: float, token_rate: float, completion_tokens: int, tool_calls: int,
+                 error_rate: float, error_status: int, seed: int, prefill_rate: float = 0):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.prefill_rate = prefill_rate
+        self.completion_tokens = completion_tokens
+        self.tool_calls = tool_calls
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def respond(self, body: dict):
+        """Return (status, payload) for one chat completion request."""
+        with self.lock:
+            self.requests += 1
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if fail:
+            time.sleep(self.latency / 4)
+            return self.error_status, {"error": {"message": "Injected error from fake LLM server",
+                                                 "type": "rate_limit_error" if self.error_status == 429
+                                                 else "server_error", "code": self.error_status}}
+
+        messages = body.get("messages") or []
+        transcript = "\n".join(text_of(message.get("content")) for message in messages)
+        # Tool results come back appended to the agent's own turns
+        observations = sum(text_of(message.get("content")).count("Observation:")
+                           for message in messages if message.get("role") == "assistant")
+        prompt_tokens = estimate_tokens(transcript)
+        # Agents given no tools (e.g. merge steps) answer straight away
+        has_tools = "Search the internet" in text_of(messages[0].get("content")) if messages else False
+        if has_tools and observations < self.tool_calls:
+            topic = SEARCH_TOPICS[(prompt_tokens + observations) % len(SEARCH_TOPICS)]
+            content = ("Thought: I should research this before answering.\n"
+                       "Action: Search the internet\n"
+                       f"Action Input: {json.dumps({'search_query': topic})}")
+        else:
+            size = min(self.completion_tokens, body.get("max_tokens") or self.completion_tokens)
+            content = ("Thought: I now know the final answer\n"
+                       f"Final Answer: {final_answer(size, prompt_tokens)}")
+        completion_tokens = estimate_tokens(content)
+        time.sleep(self.latency
+                   + (prompt_tokens / self.prefill_rate if self.prefill_rate > 0 else 0)
+                   + (completion_tokens / self.token_rate if self.token_rate > 0 else 0))
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+
+def make_handler(llm: FakeLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                return self._send(400, {"error": {"message": "Invalid JSON"}})
+            self._send(*llm.respond(body))
+
+        def do_GET(self):
+            self._send(200, {"requests": llm.requests, "errors": llm.errors})
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="completion tokens per second (0 = instant)")
+    parser.add_argument("--prefill-rate", type=float, default=0, help="prompt tokens processed per second (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=600, help="approximate size of final answers")
+    parser.add_argument("--tool-calls", type=int, default=1, help="search actions before each final answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429, choices=(429, 500, 503))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    llm = FakeLLM(args.latency, args.token_rate, args.completion_tokens, args.tool_calls,
+                  args.error_rate, args.error_status, args.seed, args.prefill_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(llm))
+    server.daemon_threads = True
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
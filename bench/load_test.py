@@ -0,0 +1,362 @@
+"""Drive the API at increasing concurrency and report latency and throughput.
+
+By default this starts the fake LLM server and the API (with fixture search
+and a throwaway data directory), so no Gemini or Serper quota is used:
+
+    python bench/load_test.py --concurrency 1,4,8 --requests 16
+    python bench/load_test.py --record bench/cassette.sqlite3     # record fake/live LLM calls
+    python bench/load_test.py --replay bench/cassette.sqlite3     # replay them deterministically
+    python bench/load_test.py --url http://localhost:8000 --server-pid 1234
+
+For every concurrency level it reports p50/p95/p99 latency, plans per
+minute, time to the first task output (streaming endpoint) and peak RSS of
+each API worker, and writes everything, with the worker's LLM token counts
+(prompt, completion), as JSON for comparing runs.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "bench" / "results"
+
+IDEAS = (
+    "A marketplace connecting home cooks with office workers looking for healthy lunches",
+    "An AI assistant that drafts grant applications for small non-profits",
+    "A subscription service renting refurbished power tools to DIY homeowners",
+    "A mobile app that helps landlords schedule and track property maintenance",
+    "A B2B platform that automates carbon accounting for mid-sized manufacturers",
+    "A language-learning app built around short daily conversations with native speakers",
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def plan_inputs(index: int) -> dict:
+    """Deterministic inputs for request ``index``, so replayed runs see the same prompts."""
+    return {
+        "startup_idea": f"{IDEAS[index % len(IDEAS)]} (variant {index})",
+        "target_market": "Urban professionals aged 25-45 in North America and Europe",
+        "team_composition": "Two technical co-founders and one business co-founder with sales experience",
+    }
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+    return {"p50": round(pick(0.50), 3), "p95": round(pick(0.95), 3), "p99": round(pick(0.99), 3),
+            "mean": round(statistics.fmean(ordered), 3), "max": round(ordered[-1], 3)}
+
+
+def llm_tokens(base_url: str) -> Dict[str, float]:
+    """Totals of ``crew_llm_tokens_total`` by kind, from one API worker's /metrics."""
+    totals: Dict[str, float] = {}
+    try:
+        with urllib.request.urlopen(f"{base_url}/metrics", timeout=10) as response:
+            lines = response.read().decode().splitlines()
+    except OSError:
+        return totals
+    for line in lines:
+        if line.startswith("crew_llm_tokens_total{"):
+            labels, value = line.rsplit(" ", 1)
+            kind = labels.split('kind="', 1)[1].split('"', 1)[0]
+            totals[kind] = totals.get(kind, 0) + float(value)
+    if totals.get("prompt"):
+        totals["cached_share"] = round(totals.get("cached", 0) / totals["prompt"], 3)
+    return totals
+
+
+def worker_pids(pid: int) -> List[int]:
+    """The server process and all of its descendants (uvicorn/gunicorn workers)."""
+    pids = [pid]
+    for current in pids:
+        for task in Path(f"/proc/{current}/task").glob("*/children"):
+            try:
+                pids.extend(int(child) for child in task.read_text().split())
+            except OSError:
+                pass
+    return pids
+
+
+def peak_rss_mb(pid: int) -> Dict[str, float]:
+    """Peak resident memory (VmHWM) of each process in the server's tree, in MB."""
+    peaks = {}
+    for worker in worker_pids(pid):
+        try:
+            for line in Path(f"/proc/{worker}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    peaks[str(worker)] = round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+    return peaks
+
+
+def run_request(base_url: str, endpoint: str, index: int, timeout: float) -> Dict:
+    """Submit one plan and time it; for the stream endpoint also time the first task event."""
+    url = urlparse(base_url)
+    path = "/run-crew/stream" if endpoint == "stream" else "/run-crew"
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    started = time.perf_counter()
+    result = {"index": index, "ok": False, "latency": None, "ttft": None, "error": None}
+    try:
+        conn.request("POST", path, body=json.dumps(plan_inputs(index)),
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        if response.status != 200:
+            result["error"] = f"HTTP {response.status}: {response.read()[:200].decode(errors='replace')}"
+        elif endpoint == "stream":
+            event = None
+            for raw in response:
+                line = raw.decode().rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if event == "task" and result["ttft"] is None:
+                        result["ttft"] = time.perf_counter() - started
+                elif line.startswith("data: ") and event in ("result", "error"):
+                    result["ok"] = event == "result"
+                    if event == "error":
+                        result["error"] = json.loads(line[len("data: "):]).get("error")
+                    break
+        else:
+            response.read()
+            result["ok"] = True
+    except (OSError, http.client.HTTPException) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        conn.close()
+    result["latency"] = time.perf_counter() - started
+    return result
+
+
+def run_level(base_url: str, endpoint: str, concurrency: int, requests: int, offset: int,
+              timeout: float, server_pid: Optional[int]) -> Dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: run_request(base_url, endpoint, offset + i, timeout), range(requests)))
+    wall = time.perf_counter() - started
+    ok = [r for r in results if r["ok"]]
+    errors = [r["error"] for r in results if not r["ok"]]
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "succeeded": len(ok),
+        "failed": len(errors),
+        "errors": sorted(set(str(error) for error in errors))[:5],
+        "wall_seconds": round(wall, 3),
+        "plans_per_minute": round(len(ok) * 60 / wall, 2) if wall else 0.0,
+        "latency_seconds": percentiles([r["latency"] for r in ok]),
+        "ttft_seconds": percentiles([r["ttft"] for r in ok if r["ttft"] is not None]),
+        "peak_rss_mb": peak_rss_mb(server_pid) if server_pid else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_stack(args, data_dir: str) -> Tuple[str, subprocess.Popen, List[subprocess.Popen], Dict[str, str]]:
+    """Start the fake LLM (unless replaying or live) and the API; returns base URL and processes."""
+    env = dict(os.environ)
+    env.update({
+        "CREW_SEARCH_BACKEND": "fixture",
+        "CREW_DATA_DIR": data_dir,
+        "CREW_CACHE_ENABLED": "true" if args.cache else "false",
+        "CREW_MAX_WORKERS": str(max(16, max(args.concurrency))),
+        "CREW_MAX_QUEUE": str(max(64, args.requests)),
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+        "CREW_LATENCY_BUDGET": str(args.latency_budget),
+    })
+    env.setdefault("GEMINI_API_KEY", "bench")
+    helpers = []
+    if args.replay:
+        env.update({"CREW_LLM_REPLAY": "replay", "CREW_LLM_CASSETTE": str(Path(args.replay).resolve())})
+    if args.record:
+        env.update({"CREW_LLM_REPLAY": "record", "CREW_LLM_CASSETTE": str(Path(args.record).resolve())})
+    if not args.live:
+        # The fake server's limits are the ones under test, so the shared limiter is off
+        env.update({"CREW_LLM_MODEL": "openai/fake-model", "CREW_LLM_FAST_MODEL": "openai/fake-fast-model",
+                    "OPENAI_API_KEY": "fake", "CREW_LLM_RPM": "0", "CREW_LLM_TPM": "0"})
+        if not args.replay:
+            # One fake server per model tier, the fast one answering sooner and generating faster
+            for variable, latency, token_rate in (("CREW_LLM_BASE_URL", args.llm_latency, args.llm_token_rate),
+                                                  ("CREW_LLM_FAST_BASE_URL", args.fast_llm_latency,
+                                                   args.fast_llm_token_rate)):
+                llm_port = free_port()
+                helpers.append(subprocess.Popen(
+                    [sys.executable, str(ROOT / "bench" / "fake_llm.py"), "--port", str(llm_port),
+                     "--latency", str(latency), "--token-rate", str(token_rate),
+                     "--prefill-rate", str(args.llm_prefill_rate),
+                     "--completion-tokens", str(args.llm_completion_tokens),
+                     "--error-rate", str(args.llm_error_rate), "--seed", str(args.seed)],
+                    cwd=ROOT, stdout=subprocess.DEVNULL))
+                env[variable] = f"http://127.0.0.1:{llm_port}/v1"
+
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    if args.workers > 1:
+        command += ["--workers", str(args.workers)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                              stderr=None if args.verbose else subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    settings = {key: value for key, value in env.items()
+                if key.startswith("CREW_") and key not in ("CREW_DATA_DIR",)}
+    return base_url, server, helpers, settings
+
+
+def compare(results: Dict, baseline_path: str) -> None:
+    baseline = {level["concurrency"]: level for level in json.loads(Path(baseline_path).read_text())["levels"]}
+    print(f"\nCompared with {baseline_path}:")
+    for level in results["levels"]:
+        before = baseline.get(level["concurrency"])
+        if before is None or not before["latency_seconds"] or not level["latency_seconds"]:
+            continue
+        p95 = level["latency_seconds"]["p95"] - before["latency_seconds"]["p95"]
+        throughput = level["plans_per_minute"] - before["plans_per_minute"]
+        print(f"  c={level['concurrency']:<3} p95 {p95:+.2f}s  plans/min {throughput:+.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="requests per level (default: 2x concurrency)")
+    parser.add_argument("--endpoint", choices=("stream", "run-crew"), default="stream",
+                        help="stream also measures time to the first task output")
+    parser.add_argument("--url", help="benchmark a running API instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="with --url, the API process to sample peak RSS from")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes to start")
+    parser.add_argument("--cache", action="store_true", help="keep the result and task caches enabled")
+    parser.add_argument("--live", action="store_true", help="use the configured LLM instead of the fake server")
+    parser.add_argument("--record", metavar="CASSETTE", help="record LLM responses to this cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="answer LLM calls from this cassette")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-token-rate", type=float, default=200)
+    parser.add_argument("--llm-prefill-rate", type=float, default=2000, help="prompt tokens per second")
+    parser.add_argument("--llm-completion-tokens", type=int, default=600, help="size of final answers")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--fast-llm-latency", type=float, default=0.2, help="latency of the fast-tier fake model")
+    parser.add_argument("--fast-llm-token-rate", type=float, default=600)
+    parser.add_argument("--latency-budget", type=float, default=0, help="per-run latency budget in seconds (0 = none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds per request")
+    parser.add_argument("--output", help="result file (default: bench/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the API server's logs")
+    args = parser.parse_args()
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    server = None
+    helpers = []
+    settings = {}
+    levels = []
+    tokens = {}
+    ready_seconds = None
+    data_dir = tempfile.TemporaryDirectory(prefix="crew-bench-")
+    try:
+        if args.url:
+            base_url, server_pid = args.url.rstrip("/"), args.server_pid
+        else:
+            base_url, server, helpers, settings = start_stack(args, data_dir.name)
+            server_pid = server.pid
+        started = time.perf_counter()
+        wait_for(f"{base_url}/healthz", 60)
+        wait_for(f"{base_url}/readyz", 120)
+        ready_seconds = round(time.perf_counter() - started, 3)
+
+        offset = 0
+        for concurrency in args.concurrency:
+            requests = args.requests or 2 * concurrency
+            print(f"c={concurrency}: {requests} requests...", flush=True)
+            level = run_level(base_url, args.endpoint, concurrency, requests, offset, args.timeout, server_pid)
+            levels.append(level)
+            offset += requests
+            latency = level["latency_seconds"] or {}
+            ttft = level["ttft_seconds"] or {}
+            print(f"  ok={level['succeeded']}/{requests} plans/min={level['plans_per_minute']} "
+                  f"p50={latency.get('p50')}s p95={latency.get('p95')}s p99={latency.get('p99')}s "
+                  f"ttft_p50={ttft.get('p50')}s rss={level['peak_rss_mb']}")
+            for error in level["errors"]:
+                print(f"  error: {error}")
+        tokens = llm_tokens(base_url)
+        if tokens:
+            print(f"LLM tokens: prompt={tokens.get('prompt', 0):.0f} cached={tokens.get('cached', 0):.0f} "
+                  f"completion={tokens.get('completion', 0):.0f}")
+    finally:
+        for process in [server, *helpers]:
+            if process is not None:
+                process.terminate()
+                process.wait()
+        data_dir.cleanup()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "endpoint": args.endpoint,
+            "target": args.url or "local",
+            "workers": args.workers,
+            "llm": "replay" if args.replay else "live" if args.live else "fake",
+            "fake_llm": None if args.live or args.replay else {
+                "latency": args.llm_latency, "token_rate": args.llm_token_rate,
+                "prefill_rate": args.llm_prefill_rate, "completion_tokens": args.llm_completion_tokens,
+                "error_rate": args.llm_error_rate, "seed": args.seed,
+                "fast_latency": args.fast_llm_latency, "fast_token_rate": args.fast_llm_token_rate},
+            "settings": settings,
+            "seconds_to_ready": ready_seconds,
+        },
+        "levels": levels,
+        "llm_tokens": tokens,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Calibrate the similarity thresholds on labelled pairs of submissions.
+
+Each line of ``bench/similarity_pairs.jsonl`` holds two submissions ``a``
+and ``b`` and whether one plan serves both (``same``). For every field this
+reports the scores of matching and differing pairs and the lowest minimum
+that lets no differing pair through, then how the current settings
+(``CREW_SIMILARITY_REUSE``, ``CREW_SIMILARITY_FIELD_MIN``) classify the set:
+
+    python bench/similarity_calibration.py
+    CREW_SIMILARITY_FIELD_MIN=startup_idea=0.7 python bench/similarity_calibration.py
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.crew.cache import INPUT_FIELDS  # noqa: E402
+from src.crew.similarity import (FIELD_MINIMUMS, REUSE_THRESHOLD, differing_fields, field_scores,  # noqa: E402
+                                 vectorize)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", default=str(ROOT / "bench" / "similarity_pairs.jsonl"))
+    parser.add_argument("--verbose", action="store_true", help="list every pair with its scores")
+    args = parser.parse_args()
+
+    pairs = [json.loads(line) for line in Path(args.pairs).read_text().splitlines() if line.strip()]
+    scored = []
+    for pair in pairs:
+        a, b = vectorize(pair["a"]), vectorize(pair["b"])
+        scored.append((pair, round(float(a @ b), 4), field_scores(a, b)))
+
+    print(f"{len(pairs)} pairs, {sum(pair['same'] for pair in pairs)} matching\n")
+    for field in INPUT_FIELDS:
+        # Differing pairs whose other fields match: only this field can tell them apart
+        differing = [fields[field] for pair, _, fields in scored if not pair["same"]
+                     and all(pair["a"][other] == pair["b"][other] for other in INPUT_FIELDS if other != field)]
+        matching = [fields[field] for pair, _, fields in scored if pair["same"]]
+        safe = round(max(differing) + 0.01, 2) if differing else None
+        recall = sum(score >= safe for score in matching) / len(matching) if safe and matching else None
+        print(f"{field:<17} matching {min(matching):.3f}..{max(matching):.3f}  "
+              f"differing max {max(differing) if differing else '-'}  "
+              f"lowest safe minimum {safe}  (recall there {recall if recall is None else round(recall, 2)})  "
+              f"configured {FIELD_MINIMUMS[field]}")
+
+    outcomes = {"true_reuse": 0, "false_reuse": 0, "missed": 0, "rejected": 0}
+    for pair, score, fields in scored:
+        reused = score >= REUSE_THRESHOLD and not differing_fields(fields)
+        outcomes[("true_reuse" if reused else "missed") if pair["same"] else
+                 ("false_reuse" if reused else "rejected")] += 1
+        if args.verbose:
+            print(f"{'same' if pair['same'] else 'diff'} {'REUSE' if reused else '-----'} {score:.3f} "
+                  f"{json.dumps(fields)} {pair.get('note', '')}: {pair['b']['startup_idea'][:60]}")
+    print(f"\nreuse at {REUSE_THRESHOLD} with {FIELD_MINIMUMS}: {outcomes}")
+
+
+if __name__ == "__main__":
+    main()
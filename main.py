@@ -1,13 +1,40 @@
+import asyncio
+import hmac
+import json
 import os
-from fastapi import FastAPI, HTTPException
+from collections import Counter
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from dotenv import load_dotenv
-from src.crew.ene_crew import EntrepreneurshipCrew
+# Only lightweight modules are imported here; crewai and friends load via src.crew.stack
+from src.crew import stack
+from src.crew.batch import BATCH_MAX_ITEMS, BATCH_MAX_RETRIES, BATCH_RETRY_CAP, run_batch
+from src.crew.run_context import DISCONNECTED, RunContext, tenant_of
+from src.crew.jobs import (JobManager, JobQueueFull, CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, TIMED_OUT,
+                           tenant_label)
+from src.crew.metrics import REGISTRY
 
 load_dotenv()
 
-app = FastAPI(title="Entrepreneurship Copilot API")
+if stack.PRELOAD:
+    # Build the crew template in the gunicorn master so forked workers start warm
+    stack.load()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Answer /healthz right away and load the crew stack in the background
+    if not stack.is_ready():
+        stack.warm_up()
+    yield
+
+
+app = FastAPI(title="Entrepreneurship Copilot API", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allows all origins
@@ -21,15 +48,443 @@ class CrewInput(BaseModel):
     startup_idea: str
     target_market: str
     team_composition: str
+    force_refresh: bool = False  # Bypass the result cache and regenerate
+    regenerate: List[str] = []  # Re-run only these tasks (and the tasks that depend on them)
+    # Reusing an earlier run's id resumes it from the tasks it already completed
+    run_id: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-]{1,64}$")
+    # Seconds the run may take; tasks move to the fast model tier, then shorten, to stay within it
+    latency_budget: Optional[float] = Field(None, gt=0)
+    # Hard stop, counted from submission: the run is cancelled and the tasks finished so far returned
+    deadline_seconds: Optional[float] = Field(None, gt=0)
 
-# Load crew on startup
-crew_instance = EntrepreneurshipCrew()
+# Kickoffs run on a bounded worker pool so the event loop stays responsive
+jobs = JobManager()
+# Sent as X-Admin-Key to see every tenant's stats and the shared cache stats; unset disables that
+ADMIN_KEY = os.getenv("CREW_ADMIN_KEY", "")
 
-@app.post("/run-crew")
-async def run_crew(input_data: CrewInput):
+
+def _caller(x_tenant_id: Optional[str] = Header(None, pattern=r"^[A-Za-z0-9_.-]{1,64}$"),
+            x_llm_api_key: Optional[str] = Header(None)) -> dict:
+    """Who is asking: the tenant their jobs are scheduled and counted under, and the LLM key their runs use.
+
+    A caller's tenant comes from its key (``CREW_TENANT_KEYS``); ``X-Tenant-Id``
+    is only checked against it. Without ``X-LLM-Api-Key`` runs use the server's
+    ``GEMINI_API_KEY`` and ``X-Tenant-Id`` must be one of ``CREW_TENANTS``. Jobs,
+    runs and plans can only be read by the tenant that created them.
+    """
+    if not x_llm_api_key and not os.getenv("GEMINI_API_KEY"):
+        raise HTTPException(status_code=401, detail="No LLM API key: send one in the X-LLM-Api-Key header.")
     try:
-        print("🚀 Running Entrepreneurship Crew...")
-        result = crew_instance.crew().kickoff(inputs=input_data.dict())
-        return {"result": result}
+        tenant = tenant_of(x_tenant_id, x_llm_api_key)
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"tenant": tenant, "api_key": x_llm_api_key}
+
+
+def _admin(x_admin_key: Optional[str] = Header(None)) -> bool:
+    """Whether the request carries the operator's ``CREW_ADMIN_KEY``."""
+    return bool(ADMIN_KEY and x_admin_key and hmac.compare_digest(x_admin_key, ADMIN_KEY))
+
+
+def _require_admin(admin: bool = Depends(_admin)):
+    if not admin:
+        raise HTTPException(status_code=403, detail="Needs the admin key (X-Admin-Key header)")
+
+
+def _collect_job_metrics():
+    stats = jobs.stats()
+    yield ("crew_jobs", "gauge", "Jobs currently queued or running in this worker.",
+           [({"status": status}, stats[status]) for status in (QUEUED, RUNNING)])
+    yield ("crew_jobs_capacity", "gauge", "Worker pool size and queue limit.",
+           [({"kind": "workers"}, stats["max_workers"]), ({"kind": "queue"}, stats["max_queue"])])
+    in_flight = Counter()
+    for tenant, counts in jobs.tenant_stats().items():
+        for status in (QUEUED, RUNNING):
+            in_flight[tenant_label(tenant), status] += counts[status]
+    yield ("crew_tenant_jobs", "gauge", "Jobs currently queued or running in this worker, by tenant.",
+           [({"tenant": tenant, "status": status}, count) for (tenant, status), count in sorted(in_flight.items())])
+
+
+def _collect_crew_metrics():
+    # Cache and LLM state live in the crew stack; skip them until it has loaded
+    if not stack.is_ready():
+        return
+    from src.crew.llm import get_concurrency
+    from src.crew.tools.websearch import web_search_tool
+
+    runner = stack.load()
+    caches = {"runs": runner.get_result_cache().stats(), "tasks": runner.get_task_cache().stats()}
+    if web_search_tool is not None:
+        search = web_search_tool.stats()
+        caches["search"] = {"hits": search.get("cache_hits", 0),
+                            "misses": search.get("queries", 0) - search.get("cache_hits", 0),
+                            "hit_rate": search["hit_rate"]}
+    yield ("crew_cache_hits_total", "counter", "Cache hits (runs and tasks: all workers; search: this worker).",
+           [({"cache": name}, stats["hits"]) for name, stats in caches.items()])
+    yield ("crew_cache_misses_total", "counter", "Cache misses (runs and tasks: all workers; search: this worker).",
+           [({"cache": name}, stats["misses"]) for name, stats in caches.items()])
+    yield ("crew_cache_hit_ratio", "gauge", "Cache hit rate.",
+           [({"cache": name}, round(stats["hit_rate"], 4)) for name, stats in caches.items()])
+    concurrency = get_concurrency().stats()
+    yield ("crew_llm_concurrency", "gauge", "Adaptive LLM concurrency limit and calls in flight.",
+           [({"kind": "limit"}, concurrency["limit"]), ({"kind": "in_flight"}, concurrency["in_flight"])])
+
+
+REGISTRY.register_collector(_collect_job_metrics)
+REGISTRY.register_collector(_collect_crew_metrics)
+
+
+class BatchInput(BaseModel):
+    items: List[CrewInput] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    # Per-item retries before an item is reported as failed
+    max_retries: int = Field(BATCH_MAX_RETRIES, ge=0, le=BATCH_RETRY_CAP)
+
+
+async def _crew_stack():
+    """Return the runner module, loading the crew stack off the event loop if needed."""
+    if stack.is_ready():
+        return stack.load()
+    try:
+        return await asyncio.to_thread(stack.load)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error running crew: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Crew stack failed to load: {e}")
+
+
+def _validate(input_data: CrewInput, caller: dict, force: bool = False):
+    unknown = set(input_data.regenerate) - set(stack.load().task_names())
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown tasks to regenerate: {sorted(unknown)}")
+    if input_data.run_id:
+        _check_run_id(input_data.run_id, caller, force)
+
+
+def _check_run_id(run_id: str, caller: dict, force: bool = False):
+    """409 if another tenant's run or plan has this id, or a run with it is still going.
+
+    A job of this worker that is queued or running always blocks the id. With ``force``, a run that
+    the checkpoints show running elsewhere does not.
+    """
+    from src.crew.archive import ARCHIVE_ENABLED, get_archive
+    from src.crew.checkpoints import CHECKPOINTS_ENABLED, RUNNING, get_checkpoint_store
+
+    run = get_checkpoint_store().get(run_id) if CHECKPOINTS_ENABLED else None
+    owners = [run, get_archive().get(run_id) if ARCHIVE_ENABLED else None]
+    if any(owner is not None and owner["tenant"] != caller["tenant"] for owner in owners):
+        raise HTTPException(status_code=409, detail=f"Run id {run_id} is already in use; choose another run_id")
+    # Two runs with one id would interleave their writes to the same checkpoint rows
+    if jobs.active_run(run_id) is not None or (run is not None and run["status"] == RUNNING and not force):
+        raise HTTPException(status_code=409, detail=f"Run {run_id} is still running; wait for it to finish "
+                                                    "or cancel it first")
+
+
+def _start(input_data: CrewInput, caller: dict, run_id: Optional[str] = None, **kwargs):
+    """Queue a crew run for ``input_data``; raises JobQueueFull when the pool is saturated."""
+    run = RunContext(run_id=input_data.run_id or run_id, latency_budget=input_data.latency_budget,
+                     deadline_seconds=input_data.deadline_seconds, **caller)
+    job = jobs.submit(stack.load().run_crew,
+                      input_data.dict(exclude={"force_refresh", "regenerate", "run_id", "latency_budget",
+                                               "deadline_seconds"}),
+                      force_refresh=input_data.force_refresh, regenerate=input_data.regenerate,
+                      run=run, tenant=run.tenant, **kwargs)
+    return job
+
+
+def _submit(input_data: CrewInput, caller: dict, force: bool = False, **kwargs):
+    _validate(input_data, caller, force)
+    try:
+        return _start(input_data, caller, **kwargs)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+def _get_job(job_id: str, caller: dict):
+    job = jobs.get(job_id)
+    # Another tenant's job is reported as missing, so ids cannot be probed
+    if job is None or job.tenant != caller["tenant"]:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+def _finished_job(job_id: str, caller: dict):
+    """The job, once it has succeeded or stopped early with some tasks done; otherwise the matching HTTP error."""
+    job = _get_job(job_id, caller)
+    if job.status in (TIMED_OUT, CANCELLED) and job.result is not None:
+        return job
+    if job.status == TIMED_OUT:
+        raise HTTPException(status_code=504, detail=job.error)
+    if job.status == CANCELLED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} was cancelled: {job.error}")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Error running crew: {job.error}")
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is still {job.status}")
+    return job
+
+
+def _plan_index(job):
+    """Section index of a finished job's result, built once and kept with the job."""
+    if job.index is None:
+        job.index = stack.load().plan_index(job.result)
+    return job.index
+
+
+def _result(job) -> dict:
+    # A run stopped by its deadline returns the tasks it finished, flagged as partial
+    return {"result": job.result, "plan": _plan_index(job).to_dict(), "run": job.run.report(),
+            "partial": job.status != SUCCEEDED, "error": job.error}
+
+
+@app.post("/run-crew")
+async def run_crew(input_data: CrewInput, request: Request, caller: dict = Depends(_caller)):
+    print("🚀 Running Entrepreneurship Crew...")
+    await _crew_stack()
+    # A client that hangs up cancels its run instead of leaving it to burn tokens
+    job = await jobs.wait(_submit(input_data, caller), disconnected=request.is_disconnected)
+    if job.status in (TIMED_OUT, CANCELLED) and job.result is not None:
+        return _result(job)
+    if job.status == TIMED_OUT:
+        raise HTTPException(status_code=504, detail=job.error)
+    if job.status == CANCELLED or not job.done:
+        raise HTTPException(status_code=409, detail=f"Run cancelled: {job.error or DISCONNECTED}")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Error running crew: {job.error}")
+    return _result(job)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@app.post("/run-crew/stream")
+async def run_crew_stream(input_data: CrewInput, caller: dict = Depends(_caller)):
+    """Stream each task's output as a server-sent event as soon as its agent finishes."""
+    runner = await _crew_stack()
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def on_task_output(output):
+        loop.call_soon_threadsafe(events.put_nowait, ("task", runner.task_event(output)))
+
+    job = _submit(input_data, caller, on_task_output=on_task_output)
+    # Task callbacks fire on the worker thread before the job finishes, so the
+    # sentinel always arrives after the last task event.
+    job.future.add_done_callback(lambda _: loop.call_soon_threadsafe(events.put_nowait, (None, None)))
+
+    async def stream():
+        try:
+            yield _sse("job", job.to_dict())
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(events.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if jobs.get(job.id).done:
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield _sse(event, data)
+            if job.status == SUCCEEDED or job.result is not None:
+                yield _sse("result", _result(job))
+            else:
+                yield _sse("error", job.to_dict())
+        finally:
+            # Starlette closes the generator when the client disconnects
+            jobs.cancel(job, DISCONNECTED)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/run-crew/batch")
+async def run_crew_batch(batch: BatchInput, caller: dict = Depends(_caller)):
+    """Run a cohort of plans with bounded concurrency, streaming NDJSON as each item settles."""
+    await _crew_stack()
+    run_ids = [item.run_id for item in batch.items if item.run_id]
+    if len(run_ids) != len(set(run_ids)):
+        raise HTTPException(status_code=422, detail="Batch items must not share a run_id")
+    for item in batch.items:
+        _validate(item, caller)
+
+    async def stream():
+        # Every item is queued under the caller's tenant, so the batch only gets that tenant's share
+        def submit(item, **kwargs):
+            return _start(item, caller, **kwargs)
+
+        async for event in run_batch(batch.items, submit, jobs, max_retries=batch.max_retries):
+            yield json.dumps(jsonable_encoder(event)) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(input_data: CrewInput, caller: dict = Depends(_caller)):
+    await _crew_stack()
+    return _submit(input_data, caller).to_dict()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, caller: dict = Depends(_caller)):
+    return _get_job(job_id, caller).to_dict()
+
+
+@app.delete("/jobs/{job_id}", status_code=202)
+async def cancel_job(job_id: str, caller: dict = Depends(_caller)):
+    """Cancel a queued or running job; it stops at its next LLM call, search or agent step."""
+    job = _get_job(job_id, caller)
+    if not jobs.cancel(job):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} cannot be cancelled (status {job.status})")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, caller: dict = Depends(_caller)):
+    return _result(_finished_job(job_id, caller))
+
+
+@app.get("/jobs/{job_id}/sections")
+async def list_sections(job_id: str, q: Optional[str] = None, caller: dict = Depends(_caller)):
+    """Outline of a finished job's plans; with ``q``, only the sections matching those keywords."""
+    index = _plan_index(_finished_job(job_id, caller))
+    keys = index.search(q) if q else list(index.sections)
+    return {"sections": [index.section(key, with_text=False) for key in keys]}
+
+
+@app.get("/jobs/{job_id}/sections/{task}/{section}")
+async def get_section(job_id: str, task: str, section: str, caller: dict = Depends(_caller)):
+    found = _plan_index(_finished_job(job_id, caller)).section(f"{task}/{section}")
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Section {task}/{section} not found")
+    return found
+
+
+@app.get("/jobs")
+async def job_stats(caller: dict = Depends(_caller), admin: bool = Depends(_admin)):
+    """The caller's jobs by status (every tenant's with the admin key) and the pool's capacity."""
+    return jobs.stats(None if admin else caller["tenant"])
+
+
+@app.get("/tenants")
+async def tenant_stats(caller: dict = Depends(_caller), admin: bool = Depends(_admin)):
+    """Per tenant: scheduling weight, jobs queued and running, throughput, latency percentiles and tokens.
+
+    Callers see only their own tenant; the admin key shows all of them.
+    """
+    return jobs.tenant_stats(None if admin else caller["tenant"])
+
+
+def _checkpoints():
+    from src.crew.checkpoints import CHECKPOINTS_ENABLED, get_checkpoint_store
+
+    if not CHECKPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Checkpoints are disabled (CREW_CHECKPOINTS=false)")
+    return get_checkpoint_store()
+
+
+def _owned_run(run_id: str, caller: dict) -> dict:
+    run = _checkpoints().get(run_id)
+    if run is None or run["tenant"] != caller["tenant"]:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return run
+
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str, caller: dict = Depends(_caller)):
+    """A run's status (running, succeeded, failed or interrupted) and the tasks it has checkpointed."""
+    return _owned_run(run_id, caller)
+
+
+@app.post("/runs/{run_id}/resume", status_code=202)
+async def resume_run(run_id: str, force: bool = False, caller: dict = Depends(_caller)):
+    """Re-queue a run with its original inputs; completed tasks are loaded from their checkpoints.
+
+    ``force`` resumes a run that the checkpoints show running in another worker, but never one
+    that is still queued or running in this worker.
+    """
+    await _crew_stack()
+    run = _owned_run(run_id, caller)
+    return _submit(CrewInput(**run["inputs"], **run["options"], run_id=run_id), caller, force=force).to_dict()
+
+
+def _archive():
+    from src.crew.archive import ARCHIVE_ENABLED, get_archive
+
+    if not ARCHIVE_ENABLED:
+        raise HTTPException(status_code=404, detail="The plan archive is disabled (CREW_ARCHIVE=false)")
+    return get_archive()
+
+
+def _archived_plan(plan_id: str, caller: dict) -> dict:
+    plan = _archive().get(plan_id)
+    if plan is None or plan["tenant"] != caller["tenant"]:
+        raise HTTPException(status_code=404, detail=f"Plan {plan_id} not found")
+    return plan
+
+
+@app.get("/plans/{plan_id}")
+async def get_plan(plan_id: str, caller: dict = Depends(_caller)):
+    """An archived plan's inputs, outline and storage size; the plan id is the run id."""
+    return await asyncio.to_thread(_archived_plan, plan_id, caller)
+
+
+@app.get("/plans/{plan_id}/export")
+async def export_plan(plan_id: str, request: Request, format: str = Query("md", pattern="^(md|json|txt)$"),
+                      caller: dict = Depends(_caller)):
+    """Stream an archived plan as markdown, JSON or text, gzipped when the client accepts it."""
+    from src.crew.archive import EXPORT_FORMATS, gzip_chunks
+
+    await asyncio.to_thread(_archived_plan, plan_id, caller)
+    # A sync generator, so Starlette reads the archive on its thread pool, off the event loop
+    chunks = _archive().export(plan_id, format)
+    headers = {"Content-Disposition": f'attachment; filename="plan-{plan_id}.{format}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[format], headers=headers)
+
+
+@app.get("/cache/stats", dependencies=[Depends(_require_admin)])
+async def cache_stats():
+    """Hit rates and sizes of the caches, similarity index and archive, which all tenants share."""
+    runner = await _crew_stack()
+    from src.crew.archive import ARCHIVE_ENABLED, get_archive
+    from src.crew.similarity import SIMILARITY_ENABLED, get_similarity_index
+    from src.crew.tools.websearch import web_search_tool
+
+    stats = {"runs": runner.get_result_cache().stats(), "tasks": runner.get_task_cache().stats()}
+    if web_search_tool is not None:
+        stats["search"] = web_search_tool.stats()
+    if SIMILARITY_ENABLED:
+        stats["similar"] = get_similarity_index().stats()
+    if ARCHIVE_ENABLED:
+        stats["archive"] = get_archive().stats()
+    return stats
+
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    await _crew_stack()
+    from src.crew.llm import llm_stats
+    from src.crew.tiers import client_pool
+
+    return {**llm_stats(), "clients": client_pool.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics for this worker: latency histograms, token counts, queue depth, cache hit rates."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving, whether or not the crew stack has loaded."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once the crew stack is loaded and runs can start without a cold import."""
+    status = stack.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,94 @@
+"""Report where import time goes and how long the API takes to answer health checks.
+
+    python scripts/import_profile.py                 # profile `import main` and the crew stack
+    python scripts/import_profile.py ui --top 30     # profile other modules
+    python scripts/import_profile.py --serve         # time to first /healthz and /readyz
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def profile_import(module: str, top: int) -> None:
+    """Import ``module`` in a fresh interpreter under ``-X importtime`` and print the top costs."""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+        return
+
+    imports = []  # (cumulative_us, self_us, name)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        imports.append((int(cumulative_us), int(self_us), name))
+
+    by_package = defaultdict(int)
+    for _, self_us, name in imports:
+        by_package[name.strip().split(".")[0]] += self_us
+
+    print(f"\nimport {module}: {wall:.2f}s wall, {len(imports)} modules")
+    print(f"\n  {'self (ms)':>10}  top-level package")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {self_us / 1000:>10.1f}  {package}")
+    print(f"\n  {'cumul (ms)':>10}  {'self (ms)':>10}  module")
+    for cumulative_us, self_us, name in sorted(imports, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:>10.1f}  {self_us / 1000:>10.1f}  {name.strip()}")
+
+
+def time_to_healthy(timeout: float) -> None:
+    """Start the API with uvicorn and time the first 200 from /healthz and /readyz."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                              cwd=ROOT, env=os.environ.copy(),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    pending = {"/healthz", "/readyz"}
+    try:
+        while pending and time.perf_counter() - started < timeout:
+            for path in sorted(pending):
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                        if response.status == 200:
+                            print(f"{path}: {time.perf_counter() - started:.2f}s after process start")
+                            pending.discard(path)
+                except OSError:
+                    pass
+            time.sleep(0.05)
+        for path in sorted(pending):
+            print(f"{path}: not healthy after {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=["main", "src.crew.runner"])
+    parser.add_argument("--top", type=int, default=15, help="rows to show per table")
+    parser.add_argument("--serve", action="store_true", help="time /healthz and /readyz of a fresh API process")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    if args.serve:
+        time_to_healthy(args.timeout)
+        return
+    for module in args.modules:
+        profile_import(module, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Compressed, deduplicated archive of generated plans, with streaming exports.
+
+Every finished run's plans are stored under its run id, split into their
+sections. Each section is stored once per distinct text (keyed by its
+SHA-256) and compressed with zstd when ``zstandard`` is installed, zlib
+otherwise, so a plan replayed from the cache or adapted from a similar one
+costs only its section list. A plan belongs to the tenant whose run
+produced it. Exports are generated a task at a time: only
+one task's compressed sections and one decompressed section are held in
+memory, whatever the size of the plan.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.crew.metrics import ARCHIVE_BYTES, EXPORT_SECONDS
+from src.crew.run_context import DEFAULT_TENANT
+from src.crew.storage import DATA_DIR, add_column, connect
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_ENABLED = os.getenv("CREW_ARCHIVE", "true").lower() in ("1", "true", "yes")
+ARCHIVE_PATH = os.getenv("CREW_ARCHIVE_PATH", str(DATA_DIR / "archive.sqlite3"))
+# "zstd", "zlib", or "auto" (zstd when installed)
+ARCHIVE_CODEC = os.getenv("CREW_ARCHIVE_CODEC", "auto")
+ARCHIVE_LEVEL = int(os.getenv("CREW_ARCHIVE_LEVEL", "9"))
+
+EXPORT_FORMATS = {
+    "md": "text/markdown; charset=utf-8",
+    "json": "application/json",
+    "txt": "text/plain; charset=utf-8",
+}
+INPUT_LABELS = {"startup_idea": "Startup Idea", "target_market": "Target Market",
+                "team_composition": "Team Composition"}
+MARKUP = re.compile(r"\*\*|__|`|^\s*#{1,6}\s+")
+
+
+def _codec() -> str:
+    if ARCHIVE_CODEC == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if ARCHIVE_CODEC == "zstd" and zstandard is None:
+        raise ValueError("CREW_ARCHIVE_CODEC=zstd needs the zstandard package (pip install zstandard)")
+    return ARCHIVE_CODEC
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ARCHIVE_LEVEL).compress(data)
+    return zlib.compress(data, ARCHIVE_LEVEL)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "none":
+        return data
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of text chunks as they come, flushing after each so clients see progress."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class PlanArchive:
+    """Plans by run id, their section lists, and the compressed section texts they share."""
+
+    def __init__(self, path: str = ARCHIVE_PATH, codec: Optional[str] = None):
+        self.path = path
+        self.codec = codec or _codec()
+        self.exports = 0
+        self.export_seconds = 0.0
+        self.last_export_seconds = 0.0
+        self._lock = threading.Lock()
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " id TEXT PRIMARY KEY, inputs TEXT NOT NULL, partial INTEGER NOT NULL, created_at REAL NOT NULL,"
+                " raw_bytes INTEGER NOT NULL, stored_bytes INTEGER NOT NULL, new_bytes INTEGER NOT NULL,"
+                " tenant TEXT NOT NULL DEFAULT 'default')"
+            )
+            add_column(conn, "plans", "tenant", "TEXT NOT NULL DEFAULT 'default'")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sections ("
+                " plan_id TEXT NOT NULL, position INTEGER NOT NULL, task TEXT NOT NULL, section TEXT NOT NULL,"
+                " title TEXT NOT NULL, level INTEGER NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (plan_id, position))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sections_hash ON sections (hash)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " hash TEXT PRIMARY KEY, codec TEXT NOT NULL, data BLOB NOT NULL, raw_size INTEGER NOT NULL)"
+            )
+
+    def store(self, plan_id: str, inputs: Dict, documents: Iterable, partial: bool = False,
+              tenant: str = DEFAULT_TENANT) -> Dict:
+        """Archive ``tenant``'s ``PlanDocument``s under ``plan_id``, replacing an earlier version.
+
+        Returns the plan's raw size, its stored (compressed) size and how many
+        of those bytes were new to the archive. Raises ValueError if the plan
+        id belongs to another tenant.
+        """
+        rows = []
+        for document in documents:
+            raw = str(document)
+            sections = document.sections
+            # Cut at the section starts so the pieces add up to the exact raw text
+            cuts = [0] + [section.start for section in sections[1:]] + [len(raw)]
+            for section, start, end in zip(sections, cuts, cuts[1:]):
+                rows.append((document.task, section, raw[start:end].encode()))
+        raw_bytes = stored_bytes = new_bytes = 0
+        with closing(connect(self.path)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                owner = conn.execute("SELECT tenant FROM plans WHERE id = ?", (plan_id,)).fetchone()
+                if owner is not None and owner[0] != tenant:
+                    raise ValueError(f"Plan {plan_id} belongs to another tenant")
+                replaced = conn.execute("DELETE FROM sections WHERE plan_id = ?", (plan_id,)).rowcount
+                for position, (task, section, data) in enumerate(rows):
+                    digest = hashlib.sha256(data).hexdigest()
+                    row = conn.execute("SELECT LENGTH(data) FROM blobs WHERE hash = ?", (digest,)).fetchone()
+                    if row is None:
+                        codec, blob = self.codec, compress(data, self.codec)
+                        if len(blob) >= len(data):
+                            codec, blob = "none", data  # Short sections can grow when compressed
+                        conn.execute("INSERT INTO blobs VALUES (?, ?, ?, ?)", (digest, codec, blob, len(data)))
+                        size = len(blob)
+                        new_bytes += size
+                    else:
+                        size = row[0]
+                    raw_bytes += len(data)
+                    stored_bytes += size
+                    conn.execute("INSERT INTO sections VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (plan_id, position, task, section.id, section.title, section.level, digest))
+                conn.execute("INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             (plan_id, json.dumps(inputs), int(partial), time.time(), raw_bytes, stored_bytes,
+                              new_bytes, tenant))
+                if replaced:
+                    conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM sections)")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        ARCHIVE_BYTES.inc(raw_bytes, kind="raw")
+        ARCHIVE_BYTES.inc(new_bytes, kind="stored")
+        return {"raw_bytes": raw_bytes, "stored_bytes": stored_bytes, "new_bytes": new_bytes}
+
+    def get(self, plan_id: str) -> Optional[Dict]:
+        """A plan's inputs, sizes and outline (without section texts), or None."""
+        with closing(connect(self.path)) as conn:
+            row = conn.execute("SELECT inputs, partial, created_at, raw_bytes, stored_bytes, new_bytes, tenant"
+                               " FROM plans WHERE id = ?", (plan_id,)).fetchone()
+            if row is None:
+                return None
+            outline = conn.execute("SELECT task, section, title, level FROM sections WHERE plan_id = ?"
+                                   " ORDER BY position", (plan_id,)).fetchall()
+        inputs, partial, created_at, raw_bytes, stored_bytes, new_bytes, tenant = row
+        tasks: Dict[str, List[Dict]] = {}
+        for task, section, title, level in outline:
+            tasks.setdefault(task, []).append({"id": f"{task}/{section}", "title": title, "level": level})
+        return {"id": plan_id, "tenant": tenant, "inputs": json.loads(inputs), "partial": bool(partial),
+                "created_at": created_at,
+                "raw_bytes": raw_bytes, "stored_bytes": stored_bytes, "new_bytes": new_bytes,
+                "tasks": [{"task": task, "sections": sections} for task, sections in tasks.items()]}
+
+    def export(self, plan_id: str, fmt: str = "md") -> Iterator[str]:
+        """Stream a plan as markdown, JSON or plain text; check ``get`` first, as a missing plan yields nothing."""
+        started = time.perf_counter()
+        try:
+            plan = self.get(plan_id)
+            if plan is None:
+                return
+            if fmt == "json":
+                yield from self._export_json(plan)
+            else:
+                yield from self._export_text(plan, plain=fmt == "txt")
+        finally:
+            elapsed = time.perf_counter() - started
+            EXPORT_SECONDS.observe(elapsed, format=fmt)
+            with self._lock:
+                self.exports += 1
+                self.export_seconds += elapsed
+                self.last_export_seconds = elapsed
+
+    def _task_texts(self, plan_id: str, task: str) -> Iterator[str]:
+        """The task's section texts in order, decompressed one at a time."""
+        # One short read per task, so no connection is held while the client consumes the stream
+        with closing(connect(self.path)) as conn:
+            rows = conn.execute("SELECT b.codec, b.data FROM sections s JOIN blobs b ON b.hash = s.hash"
+                                " WHERE s.plan_id = ? AND s.task = ? ORDER BY s.position", (plan_id, task)).fetchall()
+        for codec, data in rows:
+            yield decompress(data, codec).decode()
+
+    def _export_text(self, plan: Dict, plain: bool) -> Iterator[str]:
+        if plain:
+            yield f"ENTREPRENEURSHIP COPILOT - BUSINESS PLAN\n{'=' * 80}\n\n"
+            for field, label in INPUT_LABELS.items():
+                yield f"{label}:\n{plan['inputs'].get(field, '')}\n\n"
+        else:
+            yield "# Entrepreneurship Copilot - Business Plan\n\n"
+            for field, label in INPUT_LABELS.items():
+                yield f"**{label}:** {plan['inputs'].get(field, '')}\n\n"
+        for entry in plan["tasks"]:
+            yield f"{'=' * 80}\n\n" if plain else "---\n\n"
+            for text in self._task_texts(plan["id"], entry["task"]):
+                yield "\n".join(MARKUP.sub("", line) for line in text.split("\n")) if plain else text
+            yield "\n\n"
+        if plan["partial"]:
+            yield "(Plan generation stopped early; the remaining plans were not finished.)\n"
+
+    def _export_json(self, plan: Dict) -> Iterator[str]:
+        head = {key: plan[key] for key in ("id", "inputs", "partial", "created_at")}
+        yield json.dumps(head)[:-1] + ', "tasks": ['
+        for i, entry in enumerate(plan["tasks"]):
+            yield (", " if i else "") + f'{{"task": {json.dumps(entry["task"])}, "sections": ['
+            for j, (section, text) in enumerate(zip(entry["sections"], self._task_texts(plan["id"], entry["task"]))):
+                yield (", " if j else "") + json.dumps({**section, "text": text})
+            yield "]}"
+        yield "]}"
+
+    def stats(self) -> Dict[str, object]:
+        with closing(connect(self.path)) as conn:
+            plans, raw_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0) FROM plans").fetchone()
+            sections = conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+            unique, unique_raw, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+        return {
+            "plans": plans,
+            "sections": sections,
+            "unique_sections": unique,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored,
+            "avg_stored_bytes_per_plan": round(stored / plans) if plans else 0,
+            # Saved by storing repeated sections once, and by compressing what is stored
+            "dedup_ratio": round(raw_bytes / unique_raw, 3) if unique_raw else 0.0,
+            "compression_ratio": round(unique_raw / stored, 3) if stored else 0.0,
+            "codec": self.codec,
+            "exports": self.exports,
+            "avg_export_ms": round(self.export_seconds / self.exports * 1000, 3) if self.exports else 0.0,
+            "last_export_ms": round(self.last_export_seconds * 1000, 3),
+        }
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> PlanArchive:
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = PlanArchive()
+    return _archive
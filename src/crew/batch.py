@@ -0,0 +1,90 @@
+"""Fan a cohort of plan requests out over the job pool and stream results back."""
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import AsyncIterator, Callable, Dict, List
+
+from src.crew.jobs import CANCELLED, SUCCEEDED, Job, JobManager, JobQueueFull
+from src.crew.run_context import DISCONNECTED
+
+BATCH_CONCURRENCY = int(os.getenv("CREW_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_RETRIES = int(os.getenv("CREW_BATCH_MAX_RETRIES", "2"))
+# Largest batch and per-item retry count a client may ask for
+BATCH_MAX_ITEMS = int(os.getenv("CREW_BATCH_MAX_ITEMS", "100"))
+BATCH_RETRY_CAP = int(os.getenv("CREW_BATCH_RETRY_CAP", "5"))
+RETRY_DELAY = float(os.getenv("CREW_BATCH_RETRY_DELAY", "5"))
+
+
+async def run_batch(items: List, submit: Callable, jobs: JobManager,
+                    concurrency: int = BATCH_CONCURRENCY,
+                    max_retries: int = BATCH_MAX_RETRIES) -> AsyncIterator[Dict]:
+    """Run ``submit(item)`` for every item, yielding an event as each one settles.
+
+    At most ``concurrency`` items of the batch are in the pool at once, so a
+    large cohort cannot crowd out other users. Items finish in whatever order
+    they complete; a failed item is re-queued on its own up to ``max_retries``
+    times without holding back the rest of the batch, under the same run id so
+    the retry resumes from the tasks the failed attempt completed. Closing the
+    stream (the client went away) cancels the items still in flight.
+    """
+    total = len(items)
+    pending = list(range(total))
+    attempts: Counter = Counter()
+    run_ids: Dict[int, str] = {}
+    running: Dict[asyncio.Future, int] = {}
+    in_flight: Dict[int, Job] = {}
+    succeeded = failed = 0
+    started = time.time()
+
+    def progress() -> Dict:
+        return {"completed": succeeded, "failed": failed, "running": len(running),
+                "pending": len(pending), "total": total}
+
+    yield {"event": "batch", "total": total, "concurrency": concurrency, "max_retries": max_retries}
+    try:
+        while pending or running:
+            while pending and len(running) < concurrency:
+                index = pending[0]
+                try:
+                    job = submit(items[index], run_id=run_ids.get(index))
+                except JobQueueFull:
+                    # The shared pool is saturated; try again once something finishes.
+                    break
+                pending.pop(0)
+                attempts[index] += 1
+                if job.run is not None:
+                    run_ids[index] = job.run.run_id
+                in_flight[index] = job
+                running[asyncio.ensure_future(jobs.wait(job))] = index
+                yield {"event": "started", "index": index, "job_id": job.id,
+                       "attempt": attempts[index], **progress()}
+            if not running:
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                job = future.result()
+                del in_flight[index]
+                if job.status == SUCCEEDED:
+                    succeeded += 1
+                    yield {"event": "item", "index": index, "status": job.status, "job_id": job.id,
+                           "attempt": attempts[index], "result": job.result,
+                           "run": job.run.report() if job.run is not None else None, **progress()}
+                elif job.status != CANCELLED and attempts[index] <= max_retries:
+                    pending.append(index)
+                    yield {"event": "retry", "index": index, "status": job.status, "job_id": job.id,
+                           "attempt": attempts[index], "error": job.error, **progress()}
+                else:
+                    failed += 1
+                    yield {"event": "item", "index": index, "status": job.status, "job_id": job.id,
+                           "attempt": attempts[index], "error": job.error, **progress()}
+    finally:
+        for job in in_flight.values():
+            jobs.cancel(job, DISCONNECTED)
+
+    elapsed = time.time() - started
+    yield {"event": "done", "elapsed_seconds": round(elapsed, 3),
+           "plans_per_minute": round(succeeded * 60 / elapsed, 2) if elapsed else 0.0, **progress()}
@@ -0,0 +1,167 @@
+"""Persistent, content-addressed caches for complete crew runs and single tasks."""
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.crew.run_context import DEFAULT_TENANT
+from src.crew.storage import DATA_DIR, connect
+
+CONFIG_DIR = Path(__file__).resolve().parent / "config"
+
+CACHE_ENABLED = os.getenv("CREW_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_PATH = os.getenv("CREW_CACHE_PATH", str(DATA_DIR / "crew_cache.sqlite3"))
+CACHE_TTL = float(os.getenv("CREW_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("CREW_CACHE_MAX_ENTRIES", "1000"))
+
+INPUT_FIELDS = ("startup_idea", "target_market", "team_composition")
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def normalize_text(value) -> str:
+    """Collapse whitespace and case so trivially different submissions share a key."""
+    return " ".join(str(value).split()).casefold()
+
+
+@lru_cache(maxsize=1)
+def config_fingerprint() -> str:
+    """Hash of the agent and task definitions; editing either invalidates the cache."""
+    digest = hashlib.sha256()
+    for name in ("agents.yaml", "tasks.yaml"):
+        digest.update(name.encode())
+        digest.update((CONFIG_DIR / name).read_bytes())
+    return digest.hexdigest()
+
+
+def cache_key(inputs: dict, model: str, tiers: Optional[dict] = None, tenant: str = DEFAULT_TENANT) -> str:
+    """Key for a whole run: normalized inputs, crew configuration and model (and the model of each tier).
+
+    Keys are per tenant, so one tenant's plans are never served to another.
+    """
+    payload = {
+        "inputs": {field: normalize_text(inputs.get(field, "")) for field in INPUT_FIELDS},
+        "config": config_fingerprint(),
+        "model": model,
+        "tenant": tenant,
+    }
+    if tiers:
+        payload["tiers"] = tiers
+    return _digest(payload)
+
+
+def task_signature(task) -> dict:
+    """Stable description of a task, taken before inputs are interpolated into it."""
+    agent = task.agent
+    return {
+        "name": task.name,
+        "description": task.description,
+        "expected_output": task.expected_output,
+        "agent": [agent.role, agent.goal, agent.backstory] if agent is not None else None,
+        "placeholders": sorted(set(PLACEHOLDER.findall(task.description + task.expected_output))),
+    }
+
+
+def task_cache_key(signature: dict, inputs: dict, model: str, upstream_outputs: list,
+                   tenant: str = DEFAULT_TENANT) -> str:
+    """Key for one task of ``tenant``: its definition, the inputs it references and its upstream outputs.
+
+    Upstream outputs are hashed in, so regenerating a task invalidates every
+    task that uses it as context, and nothing else.
+    """
+    payload = {
+        "task": signature,
+        "inputs": {name: normalize_text(inputs.get(name, "")) for name in signature["placeholders"]},
+        "model": model,
+        "upstream": [hashlib.sha256(raw.encode()).hexdigest() for raw in upstream_outputs],
+        "tenant": tenant,
+    }
+    return _digest(payload)
+
+
+def _digest(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed cache with TTL expiry and least-recently-used eviction.
+
+    The database lives on local disk, so every worker process on the host
+    shares entries and hit/miss counters. ``table`` separates whole-run
+    results from per-task outputs within the same file.
+    """
+
+    def __init__(self, table: str = "results", path: str = CACHE_PATH, ttl: float = CACHE_TTL,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.table = table
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " key TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "INSERT OR IGNORE INTO counters VALUES (?, 0), (?, 0)",
+                (f"{table}.hits", f"{table}.misses"),
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached payload for ``key``, or None if missing or expired."""
+        now = time.time()
+        with closing(connect(self.path)) as conn:
+            row = conn.execute(
+                f"SELECT payload FROM {self.table} WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is not None:
+                conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._count(conn, "hits" if row is not None else "misses")
+        return row[0] if row is not None else None
+
+    def set(self, key: str, payload: str) -> None:
+        now = time.time()
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)", (key, payload, now, now)
+            )
+            self._evict(conn, now)
+
+    def stats(self) -> Dict[str, float]:
+        with closing(connect(self.path)) as conn:
+            hits, misses = (
+                conn.execute("SELECT value FROM counters WHERE name = ?", (f"{self.table}.{name}",)).fetchone()[0]
+                for name in ("hits", "misses")
+            )
+            entries, size = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+        }
+
+    def _count(self, conn, name: str) -> None:
+        conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (f"{self.table}.{name}",))
+
+    def _evict(self, conn, now: float) -> None:
+        conn.execute(f"DELETE FROM {self.table} WHERE created_at <= ?", (now - self.ttl,))
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f" SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
@@ -0,0 +1,156 @@
+"""Durable per-run task checkpoints, so an interrupted or failed run resumes where it stopped.
+
+Every task output is written to SQLite under the run id as soon as the task
+finishes. Running the same run id again (a client retry, a batch retry or
+``POST /runs/{run_id}/resume`` after a worker was killed) reloads those
+outputs instead of calling the agents again, as long as the task's inputs
+and upstream outputs are unchanged. A run id belongs to the tenant that
+first ran it. Checkpoints expire after ``CREW_CHECKPOINT_TTL`` seconds.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Optional, Tuple
+
+from src.crew.run_context import DEFAULT_TENANT
+from src.crew.storage import DATA_DIR, add_column, connect
+
+CHECKPOINTS_ENABLED = os.getenv("CREW_CHECKPOINTS", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_PATH = os.getenv("CREW_CHECKPOINT_PATH", str(DATA_DIR / "checkpoints.sqlite3"))
+CHECKPOINT_TTL = float(os.getenv("CREW_CHECKPOINT_TTL", str(24 * 3600)))
+# A running run that has not saved a checkpoint for this long is treated as interrupted
+CHECKPOINT_LEASE = float(os.getenv("CREW_CHECKPOINT_LEASE", "900"))
+GC_INTERVAL = 300
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+
+def _owner() -> str:
+    # Read on every call: gunicorn --preload forks workers after import
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str) -> bool:
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True  # Another host; only the lease can tell
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+class CheckpointStore:
+    """Run records and their completed task outputs, shared by every worker on the host."""
+
+    def __init__(self, path: str = CHECKPOINT_PATH, ttl: float = CHECKPOINT_TTL, lease: float = CHECKPOINT_LEASE):
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self._last_gc = 0.0
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " run_id TEXT PRIMARY KEY, inputs TEXT NOT NULL, options TEXT NOT NULL, status TEXT NOT NULL,"
+                " owner TEXT NOT NULL, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+                " tenant TEXT NOT NULL DEFAULT 'default')"
+            )
+            add_column(conn, "runs", "tenant", "TEXT NOT NULL DEFAULT 'default'")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " run_id TEXT NOT NULL, task TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL, PRIMARY KEY (run_id, task))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated_at)")
+
+    def begin(self, run_id: str, inputs: dict, options: dict, tenant: str = DEFAULT_TENANT) -> None:
+        """Record that ``tenant``'s ``run_id`` is (again) running in this process.
+
+        Raises ValueError if the run id belongs to another tenant.
+        """
+        now = time.time()
+        with closing(connect(self.path)) as conn:
+            claimed = conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?) ON CONFLICT (run_id) DO UPDATE SET"
+                " inputs = excluded.inputs, options = excluded.options, status = excluded.status,"
+                " owner = excluded.owner, error = NULL, updated_at = excluded.updated_at"
+                " WHERE runs.tenant = excluded.tenant",
+                (run_id, json.dumps(inputs), json.dumps(options), RUNNING, _owner(), now, now, tenant),
+            ).rowcount
+        if not claimed:
+            raise ValueError(f"Run id {run_id} is already in use; choose another run_id")
+        if now - self._last_gc > GC_INTERVAL:
+            self.gc()
+
+    def save(self, run_id: str, task: str, key: str, payload: str) -> None:
+        now = time.time()
+        with closing(connect(self.path)) as conn:
+            conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)", (run_id, task, key, payload, now))
+            conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def load(self, run_id: str) -> Dict[str, Tuple[str, str]]:
+        """Completed tasks of ``run_id`` as ``{task: (task cache key, TaskOutput JSON)}``."""
+        with closing(connect(self.path)) as conn:
+            rows = conn.execute("SELECT task, key, payload FROM checkpoints WHERE run_id = ? AND created_at > ?",
+                                (run_id, time.time() - self.ttl)).fetchall()
+        return {task: (key, payload) for task, key, payload in rows}
+
+    def finish(self, run_id: str, status: str, error: Optional[str] = None) -> None:
+        with closing(connect(self.path)) as conn:
+            conn.execute("UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                         (status, error, time.time(), run_id))
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        """The run's record and completed tasks; a run whose worker died is reported as interrupted."""
+        with closing(connect(self.path)) as conn:
+            row = conn.execute("SELECT inputs, options, status, owner, error, created_at, updated_at, tenant"
+                               " FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            tasks = [task for (task,) in conn.execute(
+                "SELECT task FROM checkpoints WHERE run_id = ? ORDER BY created_at", (run_id,))]
+        inputs, options, status, owner, error, created_at, updated_at, tenant = row
+        if status == RUNNING and (not _owner_alive(owner) or time.time() - updated_at > self.lease):
+            status = INTERRUPTED
+        return {"run_id": run_id, "tenant": tenant, "status": status, "error": error, "inputs": json.loads(inputs),
+                "options": json.loads(options), "completed_tasks": tasks, "created_at": created_at,
+                "updated_at": updated_at}
+
+    def gc(self) -> int:
+        """Delete runs and checkpoints not touched for ``ttl`` seconds; returns the number of runs removed."""
+        self._last_gc = now = time.time()
+        cutoff = now - self.ttl
+        with closing(connect(self.path)) as conn:
+            removed = conn.execute("DELETE FROM runs WHERE updated_at <= ?", (cutoff,)).rowcount
+            conn.execute("DELETE FROM checkpoints WHERE created_at <= ? OR run_id NOT IN (SELECT run_id FROM runs)",
+                         (cutoff,))
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        with closing(connect(self.path)) as conn:
+            by_status = dict(conn.execute("SELECT status, COUNT(*) FROM runs GROUP BY status").fetchall())
+            checkpoints, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM checkpoints").fetchone()
+        return {"runs": by_status, "checkpoints": checkpoints, "size_bytes": size, "ttl_seconds": self.ttl}
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = CheckpointStore()
+    return _store
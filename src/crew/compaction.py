@@ -0,0 +1,175 @@
+"""Distil upstream task outputs into a short brief before a downstream task reads them.
+
+A task that sets ``context_budget`` in tasks.yaml no longer receives the full
+text of the tasks it depends on. It gets an extractive brief instead: each
+upstream output is split into its markdown sections, optionally filtered to
+the sections listed under ``context_sections``, and the most informative
+lines of each section (figures, list items, terms the downstream task asks
+about) are kept in their original order until the token budget is spent.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+COMPACTION_ENABLED = os.getenv("CREW_CONTEXT_COMPACTION", "true").lower() in ("1", "true", "yes")
+
+HEADING = re.compile(r"^\s*(?:#{1,6}\s+(?P<md>.+?)|\*\*(?P<bold>[^*]+?)\*\*:?|\d+\.\s+\*\*(?P<num>[^*]+?)\*\*:?)\s*#*\s*$")
+BULLET = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+FIGURE = re.compile(r"\d|[$€£%]")
+WORD = re.compile(r"[a-z][a-z0-9-]{3,}")
+STOPWORDS = frozenset(
+    "about after also based been being both could each from have into make more most must only other "
+    "over plan plans provide should some such than that their them then there these they this those "
+    "through under using very well were what when where which while with within would your".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Section:
+    title: str
+    units: List[str]
+
+
+@dataclass
+class Brief:
+    text: str
+    tokens: int
+    full_tokens: int
+
+
+def settings_for(tasks_config: Dict, task_name: str) -> Optional[Dict]:
+    """The compaction settings of ``task_name``, or None when it reads full context."""
+    config = tasks_config.get(task_name) or {}
+    if not COMPACTION_ENABLED or not config.get("context_budget"):
+        return None
+    return {"budget": int(config["context_budget"]), "sections": dict(config.get("context_sections") or {})}
+
+
+def split_sections(text: str) -> List[Section]:
+    """Split markdown into sections by heading; each section is a list of bullets and sentences."""
+    sections = [Section("Overview", [])]
+    paragraph: List[str] = []
+
+    def flush():
+        if paragraph:
+            sections[-1].units.extend(s.strip() for s in SENTENCE_END.split(" ".join(paragraph)) if s.strip())
+            paragraph.clear()
+
+    for line in text.splitlines():
+        heading = HEADING.match(line)
+        if heading:
+            flush()
+            sections.append(Section(next(group for group in heading.groups() if group).strip(), []))
+        elif BULLET.match(line):
+            flush()
+            sections[-1].units.append(line.strip())
+        elif line.strip():
+            paragraph.append(line.strip())
+        else:
+            flush()
+    flush()
+    return [section for section in sections if section.units]
+
+
+def _terms(text: str) -> set:
+    return {word for word in WORD.findall(text.lower()) if word not in STOPWORDS}
+
+
+def _score(unit: str, position: int, needs: set) -> float:
+    score = 1.0
+    if FIGURE.search(unit):
+        score += 2  # Numbers, prices and percentages are what downstream plans reuse
+    if BULLET.match(unit):
+        score += 1
+    if position == 0:
+        score += 1  # Lead sentence of the section
+    score += 0.5 * min(4, len(_terms(unit) & needs))
+    return score / (1 + estimate_tokens(unit) / 60)  # Prefer dense lines over long ones
+
+
+def _wanted(section: Section, keywords: Sequence[str]) -> bool:
+    title = section.title.lower()
+    return any(keyword.lower() in title for keyword in keywords)
+
+
+def compact_context(outputs: Sequence[Tuple[str, str]], settings: Dict, needs: str = "") -> Brief:
+    """Build a brief of at most ``settings["budget"]`` tokens from ``(task_name, raw_output)`` pairs.
+
+    ``settings["sections"]`` maps an upstream task name to heading keywords;
+    only matching sections of that task are kept (all of them if none match).
+    ``needs`` is the downstream task's description, used to favour lines that
+    mention what it asks for. Context that already fits is passed through.
+    """
+    full = "\n\n".join(raw for _, raw in outputs)
+    full_tokens = estimate_tokens(full) if outputs else 0
+    budget = settings["budget"]
+    if full_tokens <= budget:
+        return Brief(full, full_tokens, full_tokens)
+
+    needed_terms = _terms(needs)
+    documents = []
+    for name, raw in outputs:
+        sections = split_sections(raw)
+        # Research notes of a section (``task.sub_task``) are filtered like the section itself
+        keywords = settings["sections"].get(name) or settings["sections"].get(name.split(".")[0]) or ()
+        if keywords:
+            sections = [section for section in sections if _wanted(section, keywords)] or sections
+        documents.append((name, sections))
+
+    # (score, document, section, unit) for every line of every kept section
+    candidates = [
+        (_score(unit, u, needed_terms), d, s, u)
+        for d, (_, sections) in enumerate(documents)
+        for s, section in enumerate(sections)
+        for u, unit in enumerate(section.units)
+    ]
+    best_per_section = {}
+    for candidate in sorted(candidates, reverse=True):
+        best_per_section.setdefault(candidate[1:3], candidate)
+
+    chosen, seen, opened = set(), set(), set()
+    used = 0
+
+    def take(candidate) -> None:
+        nonlocal used
+        _, d, s, u = candidate
+        unit = documents[d][1][s].units[u]
+        if (d, s, u) in chosen or unit.casefold() in seen:
+            return
+        cost = estimate_tokens(unit) + 1  # Line break and bullet marker
+        if (d, s) not in opened:
+            cost += estimate_tokens(f"### {documents[d][1][s].title}")
+        if d not in opened:
+            cost += estimate_tokens(f"## Brief of {documents[d][0]}")
+        if used + cost <= budget:
+            chosen.add((d, s, u))
+            seen.add(unit.casefold())
+            opened.update({d, (d, s)})
+            used += cost
+
+    # Every section first gets its best line, then the budget goes to the best lines overall
+    for candidate in sorted(best_per_section.values(), reverse=True):
+        take(candidate)
+    for candidate in sorted(candidates, reverse=True):
+        take(candidate)
+
+    parts = []
+    for d, (name, sections) in enumerate(documents):
+        if d not in opened:
+            continue
+        lines = [f"## Brief of {name}"]
+        for s, section in enumerate(sections):
+            kept = [unit for u, unit in enumerate(section.units) if (d, s, u) in chosen]
+            if kept:
+                lines.append(f"### {section.title}")
+                lines.extend(unit if BULLET.match(unit) else f"- {unit}" for unit in kept)
+        parts.append("\n".join(lines))
+    text = "\n\n".join(parts)
+    return Brief(text, estimate_tokens(text), full_tokens)
@@ -1,76 +1,145 @@
 #!/usr/bin/env python3
-import os
 import yaml
+from functools import lru_cache
+from pathlib import Path
 from crewai import Agent, Task, Crew, Process, LLM
 from crewai.project import CrewBase, agent, crew, task
 from dotenv import load_dotenv
+from src.crew.llm import LLM_BASE_URL, LLM_MODEL, CopilotLLM
+from src.crew.tiers import SETTING_KEYS, TIERS, llm_for, resolve
 from src.crew.tools.websearch import web_search_tool
+from src.crew.tracing import on_agent_step, on_task_complete
 
 # Load environment variables
 load_dotenv()
 
+CONFIG_DIR = Path(__file__).resolve().parent / "config"
+
+
+@lru_cache(maxsize=None)
+def load_config(file_name: str) -> dict:
+    """Load a YAML configuration file from this package's config directory"""
+    path = CONFIG_DIR / file_name
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return yaml.safe_load(file) or {}
+    except FileNotFoundError:
+        raise ValueError(f"Configuration file {path} not found.")
+    except yaml.YAMLError as e:
+        raise ValueError(f"Error parsing YAML file {path}: {e}")
+
+
+def validate_llm_settings(owner: str, settings) -> None:
+    """Check an ``llm_settings`` block (tier, model, max_tokens, temperature)"""
+    if settings is None:
+        return
+    if not isinstance(settings, dict):
+        raise ValueError(f"{owner} has llm_settings that are not a mapping")
+    unknown = [key for key in settings if key not in SETTING_KEYS]
+    if unknown:
+        raise ValueError(f"{owner} has unknown llm_settings {unknown}")
+    if settings.get('tier', 'quality') not in TIERS:
+        raise ValueError(f"{owner} uses unknown model tier {settings['tier']!r}; use one of {sorted(TIERS)}")
+    max_tokens = settings.get('max_tokens')
+    if max_tokens is not None and (not isinstance(max_tokens, int) or max_tokens <= 0):
+        raise ValueError(f"{owner} has an invalid max_tokens {max_tokens!r}")
+    temperature = settings.get('temperature')
+    if temperature is not None and (not isinstance(temperature, (int, float)) or not 0 <= temperature <= 2):
+        raise ValueError(f"{owner} has an invalid temperature {temperature!r}")
+
+
+def validate_config(agents_config: dict, tasks_config: dict) -> None:
+    """Fail fast on agent or task definitions the crew cannot run with"""
+    for name, config in agents_config.items():
+        missing = [key for key in ('role', 'goal', 'backstory') if not config.get(key)]
+        if missing:
+            raise ValueError(f"Agent '{name}' in agents.yaml is missing {missing}")
+        validate_llm_settings(f"Agent '{name}'", config.get('llm_settings'))
+    for name, config in tasks_config.items():
+        missing = [key for key in ('description', 'expected_output', 'agent') if not config.get(key)]
+        if missing:
+            raise ValueError(f"Task '{name}' in tasks.yaml is missing {missing}")
+        if config['agent'] not in agents_config:
+            raise ValueError(f"Task '{name}' uses unknown agent '{config['agent']}'")
+        unknown = [ctx for ctx in config.get('context', []) if ctx not in tasks_config]
+        if unknown:
+            raise ValueError(f"Task '{name}' has unknown context tasks {unknown}")
+        budget = config.get('context_budget')
+        if budget is not None and (not isinstance(budget, int) or budget <= 0):
+            raise ValueError(f"Task '{name}' has an invalid context_budget {budget!r}")
+        unknown = [ctx for ctx in config.get('context_sections') or {} if ctx not in config.get('context', [])]
+        if unknown:
+            raise ValueError(f"Task '{name}' selects sections of tasks outside its context {unknown}")
+        validate_llm_settings(f"Task '{name}'", config.get('llm_settings'))
+        subtasks = config.get('subtasks') or {}
+        for sub_name, sub_config in subtasks.items():
+            missing = [key for key in ('description', 'expected_output') if not sub_config.get(key)]
+            if missing:
+                raise ValueError(f"Sub-task '{name}.{sub_name}' is missing {missing}")
+            unknown = [dep for dep in sub_config.get('depends_on', []) if dep not in subtasks]
+            if unknown:
+                raise ValueError(f"Sub-task '{name}.{sub_name}' depends on unknown sub-tasks {unknown}")
+            validate_llm_settings(f"Sub-task '{name}.{sub_name}'", sub_config.get('llm_settings'))
+
+
 @CrewBase
 class EntrepreneurshipCrew:
     """Entrepreneurship Copilot Crew for generating business plans, MVP plans, and GTM strategies."""
     
     def __init__(self):
-        # Check for API key when crew is initialized
-        if not os.getenv("GEMINI_API_KEY"):
-            raise ValueError("GEMINI_API_KEY is not set. Please set your Google API key before generating plans.")
-        print(os.getenv("GEMINI_API_KEY"))
-        # Initialize Gemini LLM
-        self.llm = LLM(
-            model="gemini/gemini-2.0-flash",
+        # Initialize Gemini LLM (rate limited and retried across all workers);
+        # agents with llm_settings get the client for their tier instead. The
+        # API key is not needed yet: each run brings its own or uses GEMINI_API_KEY.
+        self.llm = CopilotLLM(
+            model=LLM_MODEL,
+            base_url=LLM_BASE_URL,
         )
         
-        # Load configuration files
-        self.agents_config = self._load_config('config/agents.yaml')
-        self.tasks_config = self._load_config('config/tasks.yaml')
-    
-    def _load_config(self, file_path):
-        """Load YAML configuration file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return yaml.safe_load(file)
-        except FileNotFoundError:
-            print(f"Configuration file {file_path} not found.")
-            return {}
-        except yaml.YAMLError as e:
-            print(f"Error parsing YAML file {file_path}: {e}")
-            return {}
+        # Validate the configuration files. CrewBase loads them into
+        # agents_config / tasks_config from this package's config/ directory,
+        # whatever the working directory is.
+        validate_config(load_config('agents.yaml'), load_config('tasks.yaml'))
     
+    def agent_llm(self, name: str) -> LLM:
+        settings = self.agents_config.get(name, {}).get('llm_settings')
+        return llm_for(resolve(settings)) if settings else self.llm
+
     @agent
     def business_strategy_agent(self) -> Agent:
         return Agent(
             config=self.agents_config.get('business_strategy_agent', {}),
-            llm=self.llm,
+            llm=self.agent_llm('business_strategy_agent'),
             verbose=True,
-            tools=[web_search_tool]
+            tools=[web_search_tool],
+            step_callback=on_agent_step
         )
     
     @agent
     def mvp_development_agent(self) -> Agent:
         return Agent(
             config=self.agents_config.get('mvp_development_agent', {}),
-            llm=self.llm,
+            llm=self.agent_llm('mvp_development_agent'),
             verbose=True,
-            tools=[web_search_tool]
+            tools=[web_search_tool],
+            step_callback=on_agent_step
         )
     
     @agent
     def gtm_strategy_agent(self) -> Agent:
         return Agent(
             config=self.agents_config.get('gtm_strategy_agent', {}),
-            llm=self.llm,
+            llm=self.agent_llm('gtm_strategy_agent'),
             verbose=True,
-            tools=[web_search_tool]
+            tools=[web_search_tool],
+            step_callback=on_agent_step
         )
     
     @task
     def business_plan_task(self) -> Task:
         return Task(
             config=self.tasks_config.get('business_plan_task', {}),
-            agent=self.business_strategy_agent()
+            agent=self.business_strategy_agent(),
+            callback=on_task_complete
         )
     
     @task
@@ -78,7 +147,8 @@ class EntrepreneurshipCrew:
         return Task(
             config=self.tasks_config.get('mvp_plan_task', {}),
             agent=self.mvp_development_agent(),
-            context=[self.business_plan_task()]
+            context=[self.business_plan_task()],
+            callback=on_task_complete
         )
     
     @task
@@ -86,7 +156,8 @@ class EntrepreneurshipCrew:
         return Task(
             config=self.tasks_config.get('gtm_strategy_task', {}),
             agent=self.gtm_strategy_agent(),
-            context=[self.business_plan_task(), self.mvp_plan_task()]
+            context=[self.business_plan_task(), self.mvp_plan_task()],
+            callback=on_task_complete
         )
     
     @crew
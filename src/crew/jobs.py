@@ -0,0 +1,334 @@
+"""Bounded background worker pool for long-running crew kickoffs.
+
+Jobs belong to a tenant, and a free worker takes the queued job with the
+earliest weighted fair-queueing tag rather than the oldest one: every
+tenant with queued work gets its share of the workers, in proportion to
+its weight (``CREW_TENANT_WEIGHTS``), so one tenant's batch of a hundred
+plans cannot hold back everyone else's interactive runs.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.crew.metrics import JOB_QUEUE_SECONDS, JOB_SECONDS, JOBS
+from src.crew.run_context import (CANCELLED as CANCEL_REQUESTED, DEADLINE, DEFAULT_TENANT, DISCONNECTED, TENANT_KEYS,
+                                  TENANTS, TIMEOUT, RunCancelled)
+
+# Kickoffs spend almost all of their time waiting on LLM and search round-trips,
+# so threads (not processes) are enough to keep dozens of plans in flight.
+MAX_WORKERS = int(os.getenv("CREW_MAX_WORKERS", "16"))
+MAX_QUEUE = int(os.getenv("CREW_MAX_QUEUE", "64"))
+JOB_TIMEOUT = float(os.getenv("CREW_JOB_TIMEOUT", "1800"))
+JOB_RETENTION = float(os.getenv("CREW_JOB_RETENTION", "3600"))
+# How often a waiting request checks whether its client is still connected
+DISCONNECT_POLL = float(os.getenv("CREW_DISCONNECT_POLL", "1"))
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """``"acme=3,batch-team=0.5"`` -> ``{"acme": 3.0, "batch-team": 0.5}``"""
+    weights = {}
+    for item in spec.split(","):
+        tenant, _, weight = item.partition("=")
+        if tenant.strip():
+            weights[tenant.strip()] = float(weight)
+    return weights
+
+
+# Share of the workers each tenant gets while several have jobs queued
+TENANT_WEIGHTS = parse_weights(os.getenv("CREW_TENANT_WEIGHTS", ""))
+DEFAULT_WEIGHT = float(os.getenv("CREW_TENANT_DEFAULT_WEIGHT", "1"))
+# Tenants with metric labels of their own; the rest are counted together as "other"
+LABELLED_TENANTS = {DEFAULT_TENANT} | set(TENANT_WEIGHTS) | TENANTS | set(TENANT_KEYS.values())
+OTHER_TENANTS = "other"
+# Throughput in the tenant stats is counted over this many recent seconds
+STATS_WINDOW = float(os.getenv("CREW_TENANT_STATS_WINDOW", "300"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TIMED_OUT = "timeout"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, TIMED_OUT, CANCELLED)
+
+
+def tenant_label(tenant: str) -> str:
+    """The ``tenant`` label of a tenant's metrics; unconfigured tenants share one, so labels stay bounded."""
+    return tenant if tenant in LABELLED_TENANTS else OTHER_TENANTS
+
+
+class JobQueueFull(Exception):
+    """Raised when the pool already holds as many jobs as it is allowed to."""
+
+
+@dataclass
+class Job:
+    id: str
+    timeout: float
+    tenant: str = DEFAULT_TENANT
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None  # For a timed-out or cancelled run, the tasks it finished (if any)
+    error: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False)
+    run: Any = field(default=None, repr=False)  # RunContext, when the caller attaches one
+    index: Any = field(default=None, repr=False)  # PlanIndex of the result, built on first request
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public status view of the job (without the result payload)."""
+        return {
+            "job_id": self.id,
+            "tenant": self.tenant,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "partial": self.status in (TIMED_OUT, CANCELLED) and self.result is not None,
+            "run": self.run.report() if self.run is not None else None,
+        }
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0}
+    values = sorted(values)
+    return {"p50": round(values[len(values) // 2], 3),
+            "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3)}
+
+
+class TenantStats:
+    """Job counts, recent latencies and token usage of one tenant."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.finished: Counter = Counter()
+        self.tokens: Counter = Counter()
+        self.recent = deque(maxlen=1000)  # (finished_at, queue seconds, run seconds)
+        self.last_seen = time.time()
+
+    def record(self, job: "Job") -> None:
+        self.finished[job.status] += 1
+        self.recent.append((job.finished_at, job.started_at - job.created_at, job.finished_at - job.started_at))
+        self.last_seen = job.finished_at
+        if job.run is not None:
+            for tier in job.run.tiers.values():
+                self.tokens["prompt"] += tier["prompt_tokens"]
+                self.tokens["completion"] += tier["completion_tokens"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        cutoff = time.time() - STATS_WINDOW
+        return {
+            "submitted": self.submitted,
+            **{state: self.finished[state] for state in FINISHED_STATES},
+            "jobs_per_minute": round(sum(1 for entry in self.recent if entry[0] >= cutoff) * 60 / STATS_WINDOW, 3),
+            "queue_seconds": _percentiles([entry[1] for entry in self.recent]),
+            "run_seconds": _percentiles([entry[2] for entry in self.recent]),
+            "prompt_tokens": self.tokens["prompt"],
+            "completion_tokens": self.tokens["completion"],
+        }
+
+
+class JobManager:
+    """Runs callables on a bounded thread pool and tracks their status by id.
+
+    Queued jobs wait in a weighted fair queue: a job's tag is its tenant's
+    previous tag (or the current virtual time, if later) plus one over the
+    tenant's weight, and workers always take the lowest tag.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_queue: int = MAX_QUEUE,
+                 timeout: float = JOB_TIMEOUT, retention: float = JOB_RETENTION,
+                 weights: Optional[Dict[str, float]] = None, default_weight: float = DEFAULT_WEIGHT):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retention = retention
+        self.weights = TENANT_WEIGHTS if weights is None else weights
+        self.default_weight = default_weight
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-job")
+        self._jobs: Dict[str, Job] = {}
+        self._queue: List[tuple] = []  # Heap of (tag, seq, start, job, fn, args, kwargs)
+        self._vtime = 0.0
+        self._tags: Dict[str, float] = {}  # Tag of each tenant's latest queued job
+        self._seq = itertools.count()
+        self._tenants: Dict[str, TenantStats] = {}
+        self._lock = threading.Lock()
+
+    def weight(self, tenant: str) -> float:
+        return self.weights.get(tenant, self.default_weight)
+
+    def submit(self, fn: Callable, *args, tenant: str = DEFAULT_TENANT, timeout: Optional[float] = None,
+               **kwargs) -> Job:
+        """Queue ``fn(*args, **kwargs)`` for ``tenant`` and return its job immediately.
+
+        A ``RunContext`` passed as ``run`` is attached to the job before it can start.
+        """
+        with self._lock:
+            self._prune()
+            if self._in_flight() >= self.max_workers + self.max_queue:
+                raise JobQueueFull(
+                    f"Job queue is full ({self.max_workers} running, {self.max_queue} queued)."
+                )
+            job = Job(id=uuid.uuid4().hex, timeout=timeout or self.timeout, tenant=tenant, future=Future(),
+                      run=kwargs.get("run"))
+            self._jobs[job.id] = job
+            start = max(self._vtime, self._tags.get(tenant, 0.0))
+            self._tags[tenant] = tag = start + 1 / self.weight(tenant)
+            heapq.heappush(self._queue, (tag, next(self._seq), start, job, fn, args, kwargs))
+            self._tenants.setdefault(tenant, TenantStats()).submitted += 1
+        # One pool task per job; which job it runs is decided when a worker is free
+        self._executor.submit(self._dispatch)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            self._check_timeout(job)
+        return job
+
+    def active_run(self, run_id: str) -> Optional[Job]:
+        """The queued or running job whose run has this id, if any."""
+        with self._lock:
+            return next((job for job in self._jobs.values()
+                         if not job.done and job.run is not None and job.run.run_id == run_id), None)
+
+    def cancel(self, job: Job, reason: str = CANCEL_REQUESTED) -> bool:
+        """Stop a queued or running job at its run's next check; False if it cannot be cancelled.
+
+        Only jobs with a ``RunContext`` attached can be cancelled. A queued job
+        still passes through the pool, but stops before doing any work.
+        """
+        if job.done or job.run is None:
+            return False
+        return job.run.cancel(reason)
+
+    async def wait(self, job: Job, disconnected: Optional[Callable[[], Awaitable[bool]]] = None) -> Job:
+        """Await a job from async code without blocking the event loop.
+
+        With ``disconnected``, the client is polled every ``DISCONNECT_POLL``
+        seconds while waiting, and once it has gone the job is cancelled and
+        returned straight away.
+        """
+        future = asyncio.wrap_future(job.future)
+        while not job.done:
+            # A cancelled run is waited for until it stops, so its partial result is there on return
+            remaining = None if job.run is not None and job.run.cancelled else job.timeout
+            if remaining is not None and job.started_at is not None:
+                remaining = max(0.0, job.timeout - (time.time() - job.started_at))
+            if disconnected is not None:
+                remaining = DISCONNECT_POLL if remaining is None else min(remaining, DISCONNECT_POLL)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), remaining)
+            except asyncio.TimeoutError:
+                if disconnected is not None and await disconnected():
+                    self.cancel(job, DISCONNECTED)
+                    break
+                self._check_timeout(job)
+        return job
+
+    def stats(self, tenant: Optional[str] = None) -> Dict[str, int]:
+        """Jobs by status (only ``tenant``'s, if given) and the pool's capacity."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if tenant is None or job.tenant == tenant]
+        counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+        for job in jobs:
+            self._check_timeout(job)
+            counts[job.status] += 1
+        counts["max_workers"] = self.max_workers
+        counts["max_queue"] = self.max_queue
+        return counts
+
+    def tenant_stats(self, tenant: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-tenant weight, queue, throughput, latency percentiles and tokens of recent jobs.
+
+        With ``tenant``, only that tenant's entry (if it has had jobs recently).
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if tenant is None or job.tenant == tenant]
+            tenants = {name: stats.to_dict() for name, stats in self._tenants.items() if tenant in (None, name)}
+        for job in jobs:
+            self._check_timeout(job)
+        in_flight = Counter((job.tenant, job.status) for job in jobs if not job.done)
+        return {tenant: {"weight": self.weight(tenant), "queued": in_flight[tenant, QUEUED],
+                         "running": in_flight[tenant, RUNNING], **stats}
+                for tenant, stats in sorted(tenants.items())}
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            _, _, start, job, fn, args, kwargs = heapq.heappop(self._queue)
+            self._vtime = max(self._vtime, start)
+        self._run(job, fn, args, kwargs)
+
+    def _run(self, job: Job, fn: Callable, args: tuple, kwargs: dict) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        if job.run is not None:
+            # The run enforces the timeout itself, so it stops on time whether or not anyone polls the job
+            job.run.limit(job.started_at + job.timeout, TIMEOUT)
+        JOB_QUEUE_SECONDS.observe(job.started_at - job.created_at, tenant=tenant_label(job.tenant))
+        try:
+            result = fn(*args, **kwargs)
+        except RunCancelled as e:
+            # Stored before the status changes, so whoever sees the job finished also sees its partial result
+            job.result = e.partial
+            if job.status == RUNNING:
+                job.error = f"Job exceeded its {job.timeout:.0f}s timeout." if e.reason == TIMEOUT else str(e)
+                job.status = TIMED_OUT if e.reason in (DEADLINE, TIMEOUT) else CANCELLED
+        except Exception as e:
+            if job.status == RUNNING:
+                job.status = FAILED
+                job.error = str(e)
+        else:
+            # A job that overran its timeout stays timed out; its late result is dropped.
+            if job.status == RUNNING:
+                job.result = result
+                job.status = SUCCEEDED
+        finally:
+            if job.finished_at is None:
+                job.finished_at = time.time()
+            JOBS.inc(tenant=tenant_label(job.tenant), status=job.status)
+            JOB_SECONDS.observe(time.time() - job.started_at, tenant=tenant_label(job.tenant))
+            with self._lock:
+                self._tenants.setdefault(job.tenant, TenantStats()).record(job)
+            job.future.set_result(None)
+
+    def _check_timeout(self, job: Job) -> None:
+        if job.status == RUNNING and time.time() - job.started_at > job.timeout:
+            if job.run is not None:
+                # Still running past its deadline (e.g. inside an LLM call): stop it at the next check.
+                # _run then marks it timed out, together with the tasks it finished.
+                job.run.cancel(TIMEOUT)
+                return
+            job.status = TIMED_OUT
+            job.error = f"Job exceeded its {job.timeout:.0f}s timeout."
+            job.finished_at = time.time()
+
+    def _in_flight(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+        # A tag at or behind the virtual time no longer affects scheduling
+        for tenant in [t for t, tag in self._tags.items() if tag <= self._vtime]:
+            del self._tags[tenant]
+        active = {job.tenant for job in self._jobs.values()}
+        for tenant in [t for t, stats in self._tenants.items() if t not in active and stats.last_seen < cutoff]:
+            del self._tenants[tenant]
@@ -0,0 +1,211 @@
+"""LLM client shared by the crew's agents."""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from crewai import LLM
+from litellm.exceptions import RateLimitError, ServiceUnavailableError
+from litellm.integrations.custom_logger import CustomLogger
+
+from src.crew.metrics import LLM_CALLS, LLM_SECONDS, LLM_TOKENS, LLM_WAIT_SECONDS
+from src.crew.ratelimit import MAX_RETRIES, AdaptiveConcurrency, TokenBucketLimiter, backoff_delay
+from src.crew.replay import REPLAY_MODE, ReplayMiss, call_key, get_cassette
+from src.crew.run_context import RunCancelled, current_run
+from src.crew.tracing import span
+
+LLM_MODEL = os.getenv("CREW_LLM_MODEL", "gemini/gemini-2.0-flash")
+# Point at any OpenAI-compatible endpoint (e.g. a local fake server) for testing
+LLM_BASE_URL = os.getenv("CREW_LLM_BASE_URL") or None
+COMPLETION_ESTIMATE = int(os.getenv("CREW_LLM_COMPLETION_ESTIMATE", "2000"))
+
+_limiters: Dict[Optional[str], TokenBucketLimiter] = {}
+_concurrency = None
+_lock = threading.Lock()
+
+
+def get_limiter(credential: Optional[str] = None) -> TokenBucketLimiter:
+    """The rate limiter of a credential; each API key has its own provider quota.
+
+    ``None`` is the server's own key (``GEMINI_API_KEY``).
+    """
+    limiter = _limiters.get(credential)
+    if limiter is None:
+        with _lock:
+            limiter = _limiters.get(credential)
+            if limiter is None:
+                limiter = _limiters[credential] = TokenBucketLimiter(scope=f"{credential}:" if credential else "")
+    return limiter
+
+
+def get_concurrency() -> AdaptiveConcurrency:
+    global _concurrency
+    if _concurrency is None:
+        with _lock:
+            if _concurrency is None:
+                _concurrency = AdaptiveConcurrency()
+    return _concurrency
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(str(text)) // 4 + 1
+
+
+def message_tokens(messages) -> int:
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(estimate_tokens(message.get("content", "")) for message in messages)
+
+
+def cached_tokens(usage) -> int:
+    """Prompt tokens the provider read from its cache, from a litellm ``Usage``."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or getattr(usage, "cache_read_input_tokens", None) or 0
+
+
+class UsageCapture(CustomLogger):
+    """Receives the provider's token usage for one call.
+
+    CrewAI hands the usage of a non-streaming response to every callback it
+    was given as a plain dict; litellm's own logging passes response objects,
+    which are ignored so concurrent calls never see each other's usage.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.usage = None
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        if isinstance(response_obj, dict) and response_obj.get("usage"):
+            self.usage = response_obj["usage"]
+
+
+class CopilotLLM(LLM):
+    """CrewAI LLM whose calls respect shared rate limits and survive throttling.
+
+    Each call reserves one request and its estimated tokens from the
+    cross-process token buckets, waits for an adaptive concurrency slot, and
+    retries 429/503 responses with jittered backoff instead of failing the
+    whole kickoff. Every call is recorded as an ``llm`` span with its latency,
+    rate-limit wait and token usage, labelled with the client's model tier.
+    A cancelled run's calls fail fast, and a call never waits on the provider
+    past the run's deadline. Prompt tokens a provider reports as served from
+    its own cache are recorded; prompts are not marked for caching.
+    """
+
+    # Set by tiers.llm_for; not LLM parameters, so they are never sent to the provider
+    tier = "quality"
+    credential: Optional[str] = None  # credential_id of the client's API key, None for the server's
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        run = current_run()
+        if run is not None:
+            try:
+                run.check()
+            except RunCancelled:
+                LLM_CALLS.inc(model=self.model, outcome="cancelled")
+                raise
+        labels = {"model": self.model, "tier": self.tier}
+        with span("llm", self.model, LLM_SECONDS, labels, tier=self.tier) as record:
+            if REPLAY_MODE == "replay":
+                return self._replay(messages, tools, record)
+            response = self._call(messages, tools, callbacks, available_functions, record)
+            if REPLAY_MODE == "record" and isinstance(response, str):
+                get_cassette().put(call_key(self.model, messages, tools), self.model, response)
+            return response
+
+    def _replay(self, messages, tools, record):
+        """Answer from the cassette, skipping the rate limiter and the provider."""
+        response = get_cassette().get(call_key(self.model, messages, tools))
+        if response is None:
+            LLM_CALLS.inc(model=self.model, outcome="error")
+            raise ReplayMiss(f"No recorded response for this {self.model} call; "
+                             "record one with CREW_LLM_REPLAY=record")
+        LLM_CALLS.inc(model=self.model, outcome="replayed")
+        record.update(replayed=True, prompt_tokens=message_tokens(messages),
+                      completion_tokens=estimate_tokens(response))
+        run = current_run()
+        if run is not None:
+            run.incr("llm.replayed")
+        return response
+
+    def _call(self, messages, tools, callbacks, available_functions, record):
+        run = current_run()
+        prompt_tokens = message_tokens(messages)
+        reserved = prompt_tokens + (self.max_tokens or COMPLETION_ESTIMATE)
+        attempt = 0
+        limiter = get_limiter(self.credential)
+        while True:
+            waited = limiter.acquire(reserved, run)
+            if waited:
+                LLM_WAIT_SECONDS.inc(waited)
+                record["wait_seconds"] = round(record.get("wait_seconds", 0) + waited, 3)
+                if run is not None:
+                    run.incr("llm.wait_ms", int(waited * 1000))
+            capture = UsageCapture()
+            settled = False
+            try:
+                with get_concurrency().slot(run) as outcome:
+                    try:
+                        response = super().call(messages, tools, [*(callbacks or []), capture], available_functions)
+                    except (RateLimitError, ServiceUnavailableError):
+                        outcome["throttled"] = True
+                        LLM_CALLS.inc(model=self.model, outcome="throttled")
+                        if attempt >= MAX_RETRIES:
+                            raise
+                    except Exception:
+                        LLM_CALLS.inc(model=self.model, outcome="error")
+                        if run is not None:
+                            run.check()  # A call cut off by the deadline surfaces as the cancellation
+                        raise
+                    else:
+                        usage = capture.usage
+                        prompt = getattr(usage, "prompt_tokens", None) or prompt_tokens
+                        completion = getattr(usage, "completion_tokens", None) or estimate_tokens(response)
+                        cached = cached_tokens(usage)
+                        outcome["completion_tokens"] = completion
+                        limiter.adjust(prompt + completion - reserved)
+                        settled = True
+                        LLM_CALLS.inc(model=self.model, outcome="ok")
+                        LLM_TOKENS.inc(prompt, model=self.model, tier=self.tier, kind="prompt")
+                        LLM_TOKENS.inc(completion, model=self.model, tier=self.tier, kind="completion")
+                        LLM_TOKENS.inc(cached, model=self.model, tier=self.tier, kind="cached")
+                        record.update(prompt_tokens=prompt, completion_tokens=completion, cached_tokens=cached,
+                                      attempts=attempt + 1)
+                        if run is not None:
+                            run.incr("llm.calls")
+                        return response
+            finally:
+                if not settled:
+                    # A throttled, failed or cancelled attempt generated nothing; refund its reservation
+                    limiter.adjust(-reserved)
+            if run is not None:
+                run.incr("llm.throttled")
+                run.sleep(backoff_delay(attempt))
+            else:
+                time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def _prepare_completion_params(self, messages, tools=None):
+        params = super()._prepare_completion_params(messages, tools)
+        run = current_run()
+        remaining = run.remaining() if run is not None else None
+        if remaining is not None and remaining < (params.get("timeout") or float("inf")):
+            # Cut this call's timeout (not the shared client's) to the deadline; a retry could not finish either
+            params["timeout"] = max(0.1, remaining)
+            params["max_retries"] = 0
+        return params
+
+
+def llm_stats() -> dict:
+    """Process view of the shared rate limiter and this worker's concurrency limit."""
+    stats = {"model": LLM_MODEL, "rate_limit": get_limiter().stats(), "concurrency": get_concurrency().stats(),
+             # Per-request API keys seen by this worker, each rate limited on its own
+             "request_keys": sum(1 for credential in list(_limiters) if credential),
+             # The crew's prompt prefixes (under 1k tokens) are below Gemini's minimum context-cache size
+             "prompt_cache": {"supported": False,
+                              "reason": "prompt prefixes are below the provider's minimum cacheable size"}}
+    if REPLAY_MODE != "off":
+        stats["replay"] = get_cassette().stats()
+    return stats
@@ -0,0 +1,221 @@
+"""Process-wide metrics, rendered in the Prometheus text exposition format.
+
+A deliberately small registry (counters, gauges, histograms with labels)
+so recording a sample is a dict update under a lock and the hot path stays
+cheap. Values that already live elsewhere (job queue, cache hit rates) are
+read at scrape time through collectors instead of being mirrored.
+"""
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; spans range from sub-second tool calls to half-hour runs
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# (name, type, help, [(labels, value), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.label_names, key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Named metrics plus collectors that report point-in-time values on scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+REGISTRY = Registry()
+
+RUNS = REGISTRY.counter("crew_runs_total", "Crew runs by outcome (ok, cached, error, cancelled).",
+                        ["outcome"])
+RUN_SECONDS = REGISTRY.histogram("crew_run_duration_seconds", "Wall time of a crew run.", ["outcome"])
+TASK_SECONDS = REGISTRY.histogram("crew_task_duration_seconds",
+                                  "Wall time of an executed (not cached) task or sub-task.", ["task"])
+CONTEXT_TOKENS = REGISTRY.counter("crew_context_tokens_total",
+                                  "Upstream context tokens of compacted tasks, before (full) and after compaction.",
+                                  ["kind"])
+SIMILARITY_LOOKUP_SECONDS = REGISTRY.histogram("crew_similarity_lookup_seconds",
+                                               "Latency of nearest-neighbour lookups over past submissions.",
+                                               buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+SIMILAR_RUNS = REGISTRY.counter("crew_similar_runs_total",
+                                "Runs answered from a similar earlier submission, by how (reused, adapted).",
+                                ["mode"])
+BUDGET_ACTIONS = REGISTRY.counter("crew_latency_budget_actions_total",
+                                  "Tasks downgraded, trimmed or skipped to meet a run's latency budget.", ["action"])
+CHECKPOINTS = REGISTRY.counter("crew_checkpoints_total", "Task checkpoints saved and resumed from.", ["event"])
+AGENT_STEPS = REGISTRY.counter("crew_agent_steps_total", "Agent reasoning steps, by task and step kind.",
+                               ["task", "kind"])
+LLM_SECONDS = REGISTRY.histogram("crew_llm_call_duration_seconds", "Latency of LLM calls, including retries.",
+                                 ["model", "tier"])
+LLM_CALLS = REGISTRY.counter("crew_llm_calls_total",
+                             "LLM calls by outcome (ok, replayed, throttled, error, cancelled).", ["model", "outcome"])
+LLM_TOKENS = REGISTRY.counter("crew_llm_tokens_total",
+                              "LLM tokens by kind (prompt, completion; cached is the part of prompt read from cache).",
+                              ["model", "tier", "kind"])
+LLM_WAIT_SECONDS = REGISTRY.counter("crew_llm_ratelimit_wait_seconds_total",
+                                    "Time LLM calls spent waiting for the shared rate limiter.")
+TOOL_SECONDS = REGISTRY.histogram("crew_tool_call_duration_seconds", "Latency of tool calls.", ["tool"])
+TOOL_CALLS = REGISTRY.counter("crew_tool_calls_total", "Tool calls by how they were answered.",
+                              ["tool", "source"])
+RUN_CANCELLATIONS = REGISTRY.counter("crew_run_cancellations_total",
+                                     "Runs stopped early, by reason (deadline, disconnected, timeout, cancelled).",
+                                     ["reason"])
+CANCEL_SECONDS = REGISTRY.histogram("crew_cancel_release_seconds",
+                                    "Time from a run's cancellation until its worker slot was free again.",
+                                    ["reason"])
+ARCHIVE_BYTES = REGISTRY.counter("crew_archive_bytes_total",
+                                 "Plan bytes archived (raw) and bytes they added to the archive after dedup and "
+                                 "compression (stored).", ["kind"])
+EXPORT_SECONDS = REGISTRY.histogram("crew_plan_export_seconds", "Time to stream a plan export, by format.",
+                                    ["format"], buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+JOB_QUEUE_SECONDS = REGISTRY.histogram("crew_job_queue_seconds", "Time jobs waited for a free worker.", ["tenant"])
+JOB_SECONDS = REGISTRY.histogram("crew_job_duration_seconds", "Time jobs ran on a worker, by tenant.", ["tenant"])
+JOBS = REGISTRY.counter("crew_jobs_total", "Finished jobs by tenant and final status.", ["tenant", "status"])
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,231 @@
+"""Structured plan documents and the section and insight index built from them.
+
+Each task's markdown answer is parsed once into a ``PlanDocument``: its
+sections (as offsets into the raw text, so nothing is stored twice), the
+figures it quotes, the risks it lists and its timeline. The document is
+attached to the ``TaskOutput`` as ``pydantic`` (and ``json_dict``, which
+survives the caches), and ``PlanIndex`` combines the documents of a run so
+clients can look sections up by id, keyword or topic without re-scanning
+the text.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, PrivateAttr, ValidationError
+
+from src.crew.compaction import BULLET, HEADING, STOPWORDS, WORD
+
+METRIC = re.compile(r"^\s*(?:[-*+•]|\d+[.)])?\s*(?:\*\*)?(?P<label>[^:*\n]{2,60}?)(?:\*\*)?\s*:\s*(?:\*\*)?\s*(?P<value>.*\d.*)$")
+PERIOD = re.compile(r"\b(?P<period>(?:week|month|quarter|year|phase|day|sprint)s?\s*\d+(?:\s*[-–]\s*\d+)?|q[1-4](?:\s*\d{4})?)\b",
+                    re.IGNORECASE)
+RISK_TITLES = ("risk", "threat", "challenge", "weakness")
+TIMELINE_TITLES = ("timeline", "roadmap", "milestone", "phase", "schedule")
+EMPHASIS = re.compile(r"\*\*|__|`")
+
+# Topics the UI summarises, with the words that mark a section as covering them
+TOPICS = {
+    "market": ("market", "competit", "customer", "segment"),
+    "revenue": ("revenue", "pricing", "monetiz", "financial"),
+    "launch": ("launch", "marketing", "channel", "go-to-market", "acquisition"),
+    "product": ("mvp", "product", "feature", "prototype"),
+    "team": ("team", "hiring", "founder"),
+    "risk": ("risk", "challenge", "threat", "mitigation"),
+}
+
+
+class PlanSection(BaseModel):
+    id: str
+    title: str
+    level: int
+    start: int  # Offsets of the section (heading included) in the task's raw output
+    end: int
+    keywords: List[str] = []
+
+
+class Metric(BaseModel):
+    label: str
+    value: str
+    section: str
+
+
+class Risk(BaseModel):
+    text: str
+    section: str
+
+
+class Milestone(BaseModel):
+    period: str
+    text: str
+    section: str
+
+
+class PlanDocument(BaseModel):
+    """One task's plan: its sections plus the metrics, risks and milestones found in them."""
+
+    task: str
+    title: str
+    sections: List[PlanSection]
+    metrics: List[Metric] = []
+    risks: List[Risk] = []
+    timeline: List[Milestone] = []
+
+    _raw: str = PrivateAttr(default="")
+
+    def text(self, section: PlanSection) -> str:
+        return self._raw[section.start:section.end].strip()
+
+    def __str__(self) -> str:
+        # crewai prints a task's pydantic output in place of its raw text
+        return self._raw
+
+
+def _plain(text: str) -> str:
+    return EMPHASIS.sub("", BULLET.sub("", text, count=1)).strip()
+
+
+def _slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-") or "section"
+
+
+def _keywords(text: str, limit: int = 12) -> List[str]:
+    counts: Dict[str, int] = {}
+    for word in WORD.findall(text.lower()):
+        if word not in STOPWORDS:
+            counts[word] = counts.get(word, 0) + 1
+    return sorted(counts, key=lambda word: (-counts[word], word))[:limit]
+
+
+def parse_plan(task: str, raw: str, title: Optional[str] = None) -> PlanDocument:
+    """Parse a task's markdown answer into a ``PlanDocument`` in a single pass over its lines."""
+    raw = raw or ""
+    heads = []  # (offset, level, title, has heading line)
+    offset = 0
+    for line in raw.splitlines(keepends=True):
+        heading = HEADING.match(line)
+        if heading:
+            stripped = line.lstrip()
+            level = len(stripped) - len(stripped.lstrip("#")) if heading.group("md") else 3  # Bold lines sit below ##
+            heads.append((offset, level, _plain(next(group for group in heading.groups() if group)), True))
+        offset += len(line)
+    if not heads or raw[:heads[0][0]].strip():
+        heads.insert(0, (0, 1, "Overview", False))
+    if title is None:
+        title = next((head[2] for head in heads if head[1] == 1 and head[3]), task)
+
+    sections, metrics, risks, timeline = [], [], [], []
+    seen_ids: Dict[str, int] = {}
+    for i, (start, level, section_title, has_heading) in enumerate(heads):
+        end = heads[i + 1][0] if i + 1 < len(heads) else len(raw)
+        slug = _slug(section_title)
+        seen_ids[slug] = seen_ids.get(slug, 0) + 1
+        section_id = slug if seen_ids[slug] == 1 else f"{slug}-{seen_ids[slug]}"
+        body = raw[start:end]
+        sections.append(PlanSection(id=section_id, title=section_title, level=level, start=start, end=end,
+                                    keywords=_keywords(section_title + " " + body)))
+        lowered = section_title.lower()
+        is_risk = any(word in lowered for word in RISK_TITLES)
+        is_timeline = any(word in lowered for word in TIMELINE_TITLES)
+        for line in body.splitlines()[1 if has_heading else 0:]:
+            if not line.strip():
+                continue
+            if is_risk and BULLET.match(line):
+                risks.append(Risk(text=_plain(line), section=section_id))
+            period = PERIOD.search(line)
+            if period and (is_timeline or BULLET.match(line)):
+                text = _plain(line)
+                if text.lower().startswith(period.group("period").lower()):
+                    text = text[len(period.group("period")):].lstrip(" :–-") or text
+                timeline.append(Milestone(period=period.group("period"), text=text, section=section_id))
+                continue
+            metric = METRIC.match(line)
+            if metric:
+                metrics.append(Metric(label=_plain(metric.group("label")), value=_plain(metric.group("value")),
+                                      section=section_id))
+
+    document = PlanDocument(task=task, title=title, sections=sections, metrics=metrics, risks=risks,
+                            timeline=timeline)
+    document._raw = raw
+    return document
+
+
+def structure_output(output, title: Optional[str] = None) -> PlanDocument:
+    """Attach a ``PlanDocument`` to a ``TaskOutput`` as ``pydantic`` and ``json_dict``.
+
+    Outputs read back from a cache carry the document in ``json_dict`` only,
+    which is validated instead of parsing the text again.
+    """
+    document = output.pydantic if isinstance(output.pydantic, PlanDocument) else None
+    if document is None and output.json_dict:
+        try:
+            document = PlanDocument.model_validate(output.json_dict)
+            document._raw = output.raw
+        except ValidationError:
+            document = None
+    if document is None:
+        document = parse_plan(output.name or "", output.raw, title)
+    output.pydantic = document
+    output.json_dict = document.model_dump()
+    return document
+
+
+class PlanIndex:
+    """Section, keyword and topic lookups over the documents of one run, built once per result."""
+
+    def __init__(self, documents: Iterable[PlanDocument]):
+        self.documents = list(documents)
+        self.sections: Dict[str, tuple] = {}  # "task/section" -> (document, section)
+        self.terms: Dict[str, set] = {}  # word -> ids of the sections that use it
+        section_terms = {}
+        for document in self.documents:
+            for section in document.sections:
+                key = f"{document.task}/{section.id}"
+                self.sections[key] = (document, section)
+                section_terms[key] = set(WORD.findall(document.text(section).lower())) - STOPWORDS
+                for term in section_terms[key]:
+                    self.terms.setdefault(term, set()).add(key)
+        # A topic is covered by the sections titled after it, else by those that discuss it
+        self.topics: Dict[str, List[str]] = {}
+        for topic, words in TOPICS.items():
+            titled = [key for key, (_, section) in self.sections.items()
+                      if any(word in section.title.lower() for word in words)]
+            self.topics[topic] = titled or [key for key, terms in section_terms.items()
+                                            if any(term.startswith(word) for term in terms for word in words)]
+
+    def section(self, key: str, with_text: bool = True) -> Optional[Dict]:
+        found = self.sections.get(key)
+        if found is None:
+            return None
+        document, section = found
+        entry = {"id": key, "task": document.task, "title": section.title, "level": section.level,
+                 "keywords": section.keywords}
+        if with_text:
+            entry["text"] = document.text(section)
+        return entry
+
+    def search(self, query: str) -> List[str]:
+        """Ids of the sections whose keywords or title mention every word of ``query``."""
+        words = [word for word in WORD.findall(query.lower()) if word not in STOPWORDS] or [query.lower().strip()]
+        matches = None
+        for word in words:
+            found = set(self.terms.get(word, ()))
+            found.update(key for key, (_, section) in self.sections.items() if word in section.title.lower())
+            matches = found if matches is None else matches & found
+        return [key for key in self.sections if key in (matches or ())]
+
+    def to_dict(self) -> Dict:
+        """Outline of the run for API clients: sections, metrics, risks, timeline and topic coverage."""
+        return {
+            "documents": [
+                {
+                    "task": document.task,
+                    "title": document.title,
+                    "sections": [{"id": f"{document.task}/{section.id}", "title": section.title,
+                                  "level": section.level} for section in document.sections],
+                    "metrics": [metric.model_dump() for metric in document.metrics],
+                    "risks": [risk.model_dump() for risk in document.risks],
+                    "timeline": [milestone.model_dump() for milestone in document.timeline],
+                }
+                for document in self.documents
+            ],
+            "topics": self.topics,
+        }
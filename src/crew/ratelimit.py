@@ -0,0 +1,177 @@
+"""Cross-process LLM rate limiting and adaptive concurrency control."""
+import os
+import random
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Dict
+
+from src.crew.storage import DATA_DIR, connect
+
+LLM_RPM = float(os.getenv("CREW_LLM_RPM", "60"))
+LLM_TPM = float(os.getenv("CREW_LLM_TPM", "1000000"))
+RATELIMIT_PATH = os.getenv("CREW_RATELIMIT_PATH", str(DATA_DIR / "ratelimit.sqlite3"))
+
+MIN_CONCURRENCY = int(os.getenv("CREW_LLM_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.getenv("CREW_LLM_MAX_CONCURRENCY", "8"))
+# A call counts as slow past this many seconds plus TARGET_TOKEN_LATENCY per completion token,
+# so long sections are not mistaken for an overloaded provider
+TARGET_LATENCY = float(os.getenv("CREW_LLM_TARGET_LATENCY", "20"))
+TARGET_TOKEN_LATENCY = float(os.getenv("CREW_LLM_TARGET_TOKEN_LATENCY", "0.02"))
+SLOT_POLL = 1.0
+
+MAX_RETRIES = int(os.getenv("CREW_LLM_MAX_RETRIES", "6"))
+BACKOFF_BASE = float(os.getenv("CREW_LLM_BACKOFF_BASE", "2"))
+BACKOFF_CAP = float(os.getenv("CREW_LLM_BACKOFF_CAP", "60"))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, so throttled workers do not retry in lockstep."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucketLimiter:
+    """Request and token budgets per minute, shared by every process on the host.
+
+    Bucket levels live in SQLite and are updated inside ``BEGIN IMMEDIATE``
+    transactions, so gunicorn workers and the Streamlit process draw from
+    the same budget. Callers that cannot be served wait instead of failing.
+    Limiters with different ``scope`` prefixes (one per API key) keep
+    separate buckets in the same table.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, path: str = RATELIMIT_PATH, scope: str = ""):
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.path = path
+        self.scope = scope
+        self.waits = 0
+        self.wait_seconds = 0.0
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def acquire(self, tokens: float, run=None) -> float:
+        """Block until one request and ``tokens`` tokens are available; return seconds waited.
+
+        With a ``run``, the wait ends early (raising ``RunCancelled``) once the run is cancelled.
+        """
+        waited = 0.0
+        while True:
+            delay = self._try_take({"requests": 1, "tokens": tokens})
+            if delay <= 0:
+                if waited:
+                    self.waits += 1
+                    self.wait_seconds += waited
+                return waited
+            delay = min(delay, 5.0)
+            if run is not None:
+                run.sleep(delay)
+            else:
+                time.sleep(delay)
+            waited += delay
+
+    def adjust(self, tokens: float) -> None:
+        """Charge (or refund) the difference between estimated and actual token usage."""
+        if self.limits["tokens"] > 0 and tokens:
+            with closing(connect(self.path)) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("UPDATE buckets SET level = level - ? WHERE name = ?", (tokens, f"{self.scope}tokens"))
+                conn.execute("COMMIT")
+
+    def stats(self) -> Dict[str, float]:
+        return {"rpm": self.limits["requests"], "tpm": self.limits["tokens"],
+                "waits": self.waits, "wait_seconds": round(self.wait_seconds, 3)}
+
+    def _try_take(self, amounts: Dict[str, float]) -> float:
+        """Take from every bucket atomically, or return how long to wait before retrying."""
+        now = time.time()
+        with closing(connect(self.path)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = {}
+                delay = 0.0
+                for name, amount in amounts.items():
+                    per_minute = self.limits[name]
+                    if per_minute <= 0:
+                        continue  # Unlimited
+                    row = conn.execute("SELECT level, updated_at FROM buckets WHERE name = ?",
+                                       (self.scope + name,)).fetchone()
+                    level, updated_at = row if row is not None else (per_minute, now)
+                    level = min(per_minute, level + (now - updated_at) * per_minute / 60)
+                    amount = min(amount, per_minute)  # A single call never needs more than a full bucket
+                    if level < amount:
+                        delay = max(delay, (amount - level) * 60 / per_minute)
+                    levels[name] = (level, amount)
+                if delay <= 0:
+                    for name, (level, amount) in levels.items():
+                        conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                                     (self.scope + name, level - amount, now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return delay
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight LLM calls within this process.
+
+    The limit grows by one after a window of healthy calls and halves on
+    throttling or when a call is slow for the tokens it generated, so each
+    worker settles just below the point where the provider starts pushing back.
+    """
+
+    def __init__(self, minimum: int = MIN_CONCURRENCY, maximum: int = MAX_CONCURRENCY,
+                 target_latency: float = TARGET_LATENCY, target_token_latency: float = TARGET_TOKEN_LATENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.target_token_latency = target_token_latency
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.throttled = 0
+        self._healthy = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, run=None):
+        """Hold one concurrency slot; yields a dict in which to report ``throttled`` and ``completion_tokens``.
+
+        With a ``run``, waiting for a slot ends (raising ``RunCancelled``) once the run is cancelled.
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                timeout = None
+                if run is not None:
+                    run.check()
+                    # Woken when a call finishes; a run also wakes regularly to notice it was cancelled
+                    timeout = min(SLOT_POLL, max(0.01, run.remaining() or SLOT_POLL))
+                self._cond.wait(timeout)
+            self.in_flight += 1
+        started = time.time()
+        outcome = {"throttled": False, "completion_tokens": 0}
+        try:
+            yield outcome
+        finally:
+            self._record(time.time() - started, outcome["throttled"], outcome["completion_tokens"])
+
+    def stats(self) -> Dict[str, float]:
+        return {"limit": int(self.limit), "in_flight": self.in_flight, "throttled": self.throttled,
+                "min": self.minimum, "max": self.maximum}
+
+    def _record(self, latency: float, throttled: bool, completion_tokens: int = 0) -> None:
+        slow = latency > self.target_latency + completion_tokens * self.target_token_latency
+        with self._cond:
+            self.in_flight -= 1
+            if throttled or slow:
+                self.throttled += int(throttled)
+                self.limit = max(self.minimum, self.limit / 2)
+                self._healthy = 0
+            else:
+                self._healthy += 1
+                if self._healthy >= int(self.limit):
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self._healthy = 0
+            self._cond.notify_all()
@@ -0,0 +1,73 @@
+"""Record LLM responses to a cassette and replay them without calling the provider.
+
+With ``CREW_LLM_REPLAY=record`` every successful call is stored under a hash
+of the model, messages and tools; with ``replay`` the same calls are answered
+from the cassette and a call that was never recorded fails instead of
+spending quota. Benchmarks and regression runs are then deterministic.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Optional
+
+from src.crew.storage import DATA_DIR, connect
+
+REPLAY_MODE = os.getenv("CREW_LLM_REPLAY", "off").lower()  # off | record | replay
+CASSETTE_PATH = os.getenv("CREW_LLM_CASSETTE", str(DATA_DIR / "llm_cassette.sqlite3"))
+
+
+class ReplayMiss(RuntimeError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+def call_key(model: str, messages, tools=None) -> str:
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    payload = {
+        "model": model,
+        "messages": [[message.get("role"), message.get("content")] for message in messages],
+        "tools": tools,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Cassette:
+    """Recorded LLM responses in SQLite, shared by every worker on the host."""
+
+    def __init__(self, path: str = CASSETTE_PATH):
+        self.path = path
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS calls ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, recorded_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with closing(connect(self.path)) as conn:
+            row = conn.execute("SELECT response FROM calls WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        with closing(connect(self.path)) as conn:
+            conn.execute("INSERT OR REPLACE INTO calls VALUES (?, ?, ?, ?)", (key, model, response, time.time()))
+
+    def stats(self) -> Dict[str, object]:
+        with closing(connect(self.path)) as conn:
+            calls = conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+        return {"mode": REPLAY_MODE, "path": self.path, "calls": calls}
+
+
+_cassette = None
+_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        with _lock:
+            if _cassette is None:
+                _cassette = Cassette()
+    return _cassette
@@ -0,0 +1,240 @@
+"""Per-run state that tools and helpers can reach without threading it through CrewAI."""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+SEARCH_BUDGET = int(os.getenv("CREW_SEARCH_BUDGET", "30"))
+# Seconds a run may take before its tasks are moved to faster models; 0 disables
+LATENCY_BUDGET = float(os.getenv("CREW_LATENCY_BUDGET", "0"))
+# Spans kept per run for the trace; later spans still count towards the timings
+MAX_SPANS = int(os.getenv("CREW_TRACE_MAX_SPANS", "5000"))
+
+DEFAULT_TENANT = "default"  # Runs with neither a tenant nor an API key of their own
+
+
+def parse_tenant_keys(spec: str) -> Dict[str, str]:
+    """``"acme=3f2a9c01b7de,acme=77e0c4d2a913"`` -> ``{"3f2a9c01b7de": "acme", "77e0c4d2a913": "acme"}``"""
+    keys = {}
+    for item in spec.split(","):
+        tenant, _, key_id = item.partition("=")
+        if tenant.strip() and key_id.strip():
+            keys[key_id.strip()] = tenant.strip()
+    return keys
+
+
+# Tenant of each API key, by credential_id; other keys are a tenant of their own
+TENANT_KEYS = parse_tenant_keys(os.getenv("CREW_TENANT_KEYS", ""))
+# Tenants that callers on the server's key may name in X-Tenant-Id
+TENANTS = {name.strip() for name in os.getenv("CREW_TENANTS", "").split(",") if name.strip()}
+
+# Why a run was cancelled
+DEADLINE = "deadline"  # Its deadline_seconds passed
+DISCONNECTED = "disconnected"  # The client that asked for it went away
+TIMEOUT = "timeout"  # It overran the job timeout
+CANCELLED = "cancelled"  # Someone cancelled it explicitly
+FAILED = "failed"  # One of its tasks failed, so the ones still running are stopped
+
+_current_run: ContextVar[Optional["RunContext"]] = ContextVar("current_run", default=None)
+
+
+def credential_id(api_key: Optional[str]) -> Optional[str]:
+    """Short, non-reversible name for an API key, safe to use in keys, stats and logs."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else None
+
+
+def tenant_of(tenant: Optional[str], api_key: Optional[str]) -> str:
+    """The tenant a caller's runs belong to, taken from its API key when it sends one.
+
+    A caller on the server's key may only name a tenant listed in ``CREW_TENANTS``;
+    naming any other tenant, or one its key does not belong to, raises ValueError.
+    """
+    if api_key:
+        key_id = credential_id(api_key)
+        owner = TENANT_KEYS.get(key_id, f"key-{key_id}")
+        if tenant and tenant != owner:
+            raise ValueError(f"This API key does not belong to tenant {tenant}")
+        return owner
+    if tenant and tenant not in TENANTS:
+        raise ValueError(f"Unknown tenant {tenant}")
+    return tenant or DEFAULT_TENANT
+
+
+class RunCancelled(Exception):
+    """Raised inside a run once it is cancelled or past its deadline.
+
+    The runner attaches the tasks finished so far as ``partial`` (a
+    ``CrewOutput``, or None when no task had finished).
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.partial = None
+
+
+class RunContext:
+    """Counters, limits and the cancellation state of a single crew run.
+
+    The runner activates the context around a kickoff; code running inside it
+    (tools, LLM wrappers) finds it with ``current_run()``. LLM calls, searches
+    and agent steps call ``check()`` so a cancelled run stops at the next one.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, search_budget: int = SEARCH_BUDGET,
+                 latency_budget: Optional[float] = None, deadline_seconds: Optional[float] = None,
+                 disconnected: Optional[Callable[[], bool]] = None, tenant: Optional[str] = None,
+                 api_key: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.api_key = api_key  # The caller's LLM key, None for the server's; never reported
+        # Callers that name no tenant are grouped by their key
+        self.tenant = tenant or tenant_of(None, api_key)
+        self.search_budget = search_budget
+        self.latency_budget = LATENCY_BUDGET if latency_budget is None else latency_budget
+        self.started_at = time.time()
+        # Counted from submission, so time spent queued counts against it
+        self.deadline = self.started_at + deadline_seconds if deadline_seconds else None
+        self.deadline_reason = DEADLINE  # Why the run is cancelled once the deadline passes
+        self.disconnected = disconnected  # Polled by check(), for callers that cannot call cancel()
+        self.cancel_reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None
+        self._cancelled = threading.Event()
+        self.finished_at: Optional[float] = None
+        self.counters: Counter = Counter()
+        self.spans: List[Dict] = []
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.similar: Optional[Dict] = None  # Set when an earlier, similar submission's plan was reused
+        self.archived: Optional[Dict] = None  # Raw and stored bytes of the run's plans in the archive
+        self.budget_actions: List[Dict] = []  # Tasks moved to a faster tier, trimmed or skipped
+        self.tiers: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            self.counters[name] += amount
+            return self.counters[name]
+
+    def add_span(self, span: Dict) -> None:
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+            timing = self.timings.setdefault(span["kind"], {"count": 0, "seconds": 0.0})
+            timing["count"] += 1
+            timing["seconds"] += span["duration"]
+            if span["kind"] == "llm":
+                tier = self.tiers.setdefault(span.get("tier", "quality"), {
+                    "calls": 0, "seconds": 0.0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0})
+                tier["calls"] += 1
+                tier["seconds"] += span["duration"]
+                tier["prompt_tokens"] += span.get("prompt_tokens", 0)
+                tier["cached_tokens"] += span.get("cached_tokens", 0)
+                tier["completion_tokens"] += span.get("completion_tokens", 0)
+
+    def budget_action(self, task: str, action: str, settings: Dict) -> None:
+        with self._lock:
+            self.budget_actions.append({"task": task, "action": action, "tier": settings["tier"],
+                                        "model": settings["model"]})
+
+    def cancel(self, reason: str = CANCELLED) -> bool:
+        """Ask the run to stop at its next check; False if it was already cancelled."""
+        with self._lock:
+            if self.cancel_reason is not None:
+                return False
+            self.cancel_reason = reason
+            self.cancelled_at = time.time()
+        self._cancelled.set()
+        return True
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+    def limit(self, at: float, reason: str) -> None:
+        """Bring the deadline forward to ``at``; a run still going then is cancelled with ``reason``."""
+        with self._lock:
+            if self.deadline is None or at < self.deadline:
+                self.deadline, self.deadline_reason = at, reason
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one."""
+        return None if self.deadline is None else self.deadline - time.time()
+
+    def check(self) -> None:
+        """Raise ``RunCancelled`` if the run was cancelled, its client left or its deadline passed."""
+        if self.cancel_reason is None:
+            if self.deadline is not None and time.time() >= self.deadline:
+                self.cancel(self.deadline_reason)
+            elif self.disconnected is not None and self.disconnected():
+                self.cancel(DISCONNECTED)
+        if self.cancel_reason is not None:
+            raise RunCancelled(self.cancel_reason, f"Run {self.run_id} stopped: {self.cancel_reason}")
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, waking early (and raising) if the run is cancelled meanwhile."""
+        remaining = self.remaining()
+        self._cancelled.wait(seconds if remaining is None else max(0.0, min(seconds, remaining)))
+        self.check()
+
+    def report(self) -> Dict:
+        """Summary of the run, suitable for returning to API clients."""
+        end = self.finished_at or time.time()
+        with self._lock:
+            counters = dict(self.counters)
+            timings = {kind: {"count": timing["count"], "seconds": round(timing["seconds"], 3)}
+                       for kind, timing in self.timings.items()}
+            tiers = {name: {**tier, "seconds": round(tier["seconds"], 3)} for name, tier in self.tiers.items()}
+            actions = list(self.budget_actions)
+        queries = counters.get("search.queries", 0)
+        full_context = counters.get("context.full_tokens", 0)
+        cached = sum(tier["cached_tokens"] for tier in tiers.values())
+        return {
+            "run_id": self.run_id,
+            "tenant": self.tenant,
+            "elapsed_seconds": round(end - self.started_at, 3),
+            "counters": counters,
+            # Time spent per span kind (run, task, llm, tool); nested spans overlap
+            "timings": timings,
+            "search": {
+                "queries": queries,
+                "backend_calls": counters.get("search.backend_calls", 0),
+                "cache_hits": counters.get("search.cache_hits", 0),
+                "coalesced": counters.get("search.coalesced", 0),
+                "hit_rate": round(counters.get("search.cache_hits", 0) / queries, 3) if queries else 0.0,
+                "budget": self.search_budget,
+            },
+            "similar": self.similar,
+            "archive": self.archived,
+            "cancelled": self.cancel_reason,
+            # LLM calls, latency and tokens per model tier
+            "tiers": tiers,
+            "budget": {"seconds": self.latency_budget, "actions": actions} if self.latency_budget else None,
+            # Prompts are not marked for caching; cached_tokens is only what a provider cached on its own
+            "prompt_cache": {"supported": False, "cached_tokens": cached},
+            "context": {
+                "full_tokens": full_context,
+                "compacted_tokens": counters.get("context.compacted_tokens", 0),
+                "reduction": round(1 - counters.get("context.compacted_tokens", 0) / full_context, 3)
+                if full_context else 0.0,
+            },
+        }
+
+
+def current_run() -> Optional[RunContext]:
+    """Return the run being executed on this thread, if any."""
+    return _current_run.get()
+
+
+@contextmanager
+def activate(run: RunContext):
+    """Make ``run`` the current run for the duration of the block."""
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        run.finished_at = time.time()
+        _current_run.reset(token)
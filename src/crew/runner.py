@@ -0,0 +1,368 @@
+"""Crew execution helpers shared by the API and the Streamlit UI."""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from crewai import Crew
+from crewai.crews.crew_output import CrewOutput
+from crewai.tasks.task_output import TaskOutput
+from crewai.types.usage_metrics import UsageMetrics
+
+from src.crew.archive import ARCHIVE_ENABLED, get_archive
+from src.crew.cache import CACHE_ENABLED, ResultCache, cache_key, task_cache_key, task_signature
+from src.crew.checkpoints import CHECKPOINTS_ENABLED, FAILED, SUCCEEDED, get_checkpoint_store
+from src.crew.compaction import compact_context, settings_for
+from src.crew.metrics import (BUDGET_ACTIONS, CANCEL_SECONDS, CHECKPOINTS, CONTEXT_TOKENS, RUN_CANCELLATIONS,
+                              RUN_SECONDS, RUNS, SIMILAR_RUNS, TASK_SECONDS)
+from src.crew.outputs import PlanIndex, structure_output
+from src.crew.run_context import FAILED, RunCancelled, RunContext, activate
+from src.crew.scheduler import DAG_PARALLELISM, SCHEDULER, build_graph, run_graph
+from src.crew.similarity import (ADAPT_KEEP, ADAPT_THRESHOLD, REUSE_THRESHOLD, SIMILARITY_ENABLED,
+                                 differing_fields, get_similarity_index, referenced_fields)
+from src.crew.template import CrewCopy, CrewTemplate, get_crew_template
+from src.crew.tiers import SKIPPED_NOTE, TRIM_NOTE, LatencyBudget, llm_for, task_times, tier_models
+from src.crew.tracing import span, write_trace
+
+# The structured plan travels in json_dict; a BaseModel-typed field does not round-trip through JSON
+TASK_CACHE_EXCLUDE = {"pydantic"}
+RESULT_CACHE_EXCLUDE = {"pydantic": True, "tasks_output": {"__all__": {"pydantic"}}}
+
+
+class StepCrew(Crew):
+    """One-task crew that can hand its task a prepared context instead of the raw upstream outputs."""
+
+    context_override: Optional[str] = None
+
+    def _get_context(self, task, task_outputs):
+        if self.context_override is not None:
+            return self.context_override
+        return super()._get_context(task, task_outputs)
+
+
+_result_cache = None
+_task_cache = None
+_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide handle on the shared run cache."""
+    global _result_cache
+    if _result_cache is None:
+        with _lock:
+            if _result_cache is None:
+                _result_cache = ResultCache("results")
+    return _result_cache
+
+
+def get_task_cache() -> ResultCache:
+    """Return the process-wide handle on the shared per-task output cache."""
+    global _task_cache
+    if _task_cache is None:
+        with _lock:
+            if _task_cache is None:
+                _task_cache = ResultCache("task_outputs")
+    return _task_cache
+
+
+def task_names() -> list:
+    """Names of the crew's tasks, in execution order."""
+    return get_crew_template().task_names
+
+
+def task_event(output) -> dict:
+    """Serializable summary of a finished task, as streamed to clients."""
+    return {"task": output.name, "agent": output.agent, "raw": output.raw, "plan": output.json_dict}
+
+
+def plan_index(result: CrewOutput) -> PlanIndex:
+    """Section, keyword and topic index over a run's structured task outputs."""
+    return PlanIndex(structure_output(output) for output in result.tasks_output)
+
+
+def run_crew(inputs: dict, on_task_output: Optional[Callable] = None,
+             force_refresh: bool = False, regenerate: Iterable[str] = (),
+             run: Optional[RunContext] = None):
+    """Run the crew on a private copy so concurrent runs never share task state.
+
+    ``on_task_output`` is called with each task's ``TaskOutput`` as soon as its
+    agent finishes, before the downstream tasks start. Identical submissions
+    are answered from the run cache, and unchanged tasks from the task cache,
+    unless ``force_refresh`` is set. Near-duplicates of an earlier submission
+    reuse its plan, or its ``CREW_SIMILARITY_KEEP`` tasks when less similar. Tasks named in ``regenerate`` are re-run
+    together with the tasks that depend on them. Pass a ``RunContext`` as
+    ``run`` to read the run's counters and timings afterwards, or to give
+    the run a latency budget, a deadline, a way to cancel it or the API key
+    its LLM calls use (the server's ``GEMINI_API_KEY`` otherwise); running an
+    earlier run id again resumes it from its checkpointed tasks. A cancelled
+    run raises ``RunCancelled`` carrying the tasks it finished.
+    """
+    with activate(run or RunContext()) as run:
+        labels = {"outcome": "error"}
+        try:
+            with span("run", "crew", RUN_SECONDS, labels):
+                run.check()  # It may have been cancelled, or run out of time, while queued
+                result = _run(inputs, on_task_output, force_refresh, regenerate, run)
+                reused = run.counters["cache.run_hits"] or run.counters["similar.reused"]
+                labels["outcome"] = "cached" if reused else "ok"
+                _archive(run, inputs, result)
+            return result
+        except RunCancelled as e:
+            if e.partial is not None:
+                _archive(run, inputs, e.partial, partial=True)
+            labels["outcome"] = "cancelled"
+            RUN_CANCELLATIONS.inc(reason=e.reason)
+            CANCEL_SECONDS.observe(max(0.0, time.time() - run.cancelled_at), reason=e.reason)
+            raise
+        finally:
+            RUNS.inc(**labels)
+            write_trace(run)
+
+
+def _run(inputs: dict, on_task_output: Optional[Callable], force_refresh: bool,
+         regenerate: Iterable[str], run: RunContext) -> CrewOutput:
+    template = get_crew_template()
+    model = template.model
+    regenerate = set(regenerate)
+    key = cache_key(inputs, model, tier_models(), tenant=run.tenant)
+    similar = None
+    if CACHE_ENABLED and not force_refresh and not regenerate:
+        cached = get_result_cache().get(key)
+        if cached is not None:
+            run.incr("cache.run_hits")
+            return _replay(_load_result(cached), on_task_output)
+        if SIMILARITY_ENABLED:
+            similar = _find_similar(inputs, run.tenant, {name: referenced_fields(config)
+                                                         for name, config in template.tasks_config.items()})
+        if similar is not None and similar[3] is None:
+            run.incr("similar.reused")
+            SIMILAR_RUNS.inc(mode="reused")
+            run.similar = {"mode": "reused", "score": similar[0], "fields": similar[2]}
+            # The next identical submission is then an exact hit
+            get_result_cache().set(key, similar[1].model_dump_json(exclude=RESULT_CACHE_EXCLUDE))
+            return _replay(similar[1], on_task_output)
+
+    seed = {}
+    if similar is not None:
+        seed = {output.name: output for output in similar[1].tasks_output if output.name in similar[3]}
+        if seed:
+            run.incr("similar.adapted")
+            SIMILAR_RUNS.inc(mode="adapted")
+            run.similar = {"mode": "adapted", "score": similar[0], "fields": similar[2], "kept": sorted(seed)}
+
+    if not run.api_key and not os.getenv("GEMINI_API_KEY"):
+        raise ValueError("GEMINI_API_KEY is not set and no API key was passed with the request. "
+                         "Please set your Google API key before generating plans.")
+    started = time.perf_counter()
+    crew = template.instantiate()
+    run.incr("crew.setup_us", int((time.perf_counter() - started) * 1e6))
+    if CHECKPOINTS_ENABLED:
+        options = {"force_refresh": force_refresh, "regenerate": sorted(regenerate),
+                   "latency_budget": run.latency_budget or None}
+        get_checkpoint_store().begin(run.run_id, inputs, options, tenant=run.tenant)
+    if force_refresh:
+        regenerate = set(template.task_names)
+    try:
+        result = _run_tasks(crew, template, inputs, regenerate, on_task_output, run, seed)
+    except BaseException as e:
+        if CHECKPOINTS_ENABLED:
+            get_checkpoint_store().finish(run.run_id, FAILED, f"{type(e).__name__}: {e}")
+        raise
+    if CHECKPOINTS_ENABLED:
+        get_checkpoint_store().finish(run.run_id, SUCCEEDED)
+    # A plan cut down to meet a latency budget is not what the next identical submission should get
+    if CACHE_ENABLED and not run.budget_actions:
+        get_result_cache().set(key, result.model_dump_json(exclude=RESULT_CACHE_EXCLUDE))
+        if SIMILARITY_ENABLED:
+            get_similarity_index().add(inputs, key, tenant=run.tenant)
+    return result
+
+
+def _archive(run: RunContext, inputs: dict, result: CrewOutput, partial: bool = False) -> None:
+    """Keep the run's plans in the archive under its run id, for exports; never fails the run."""
+    if not ARCHIVE_ENABLED:
+        return
+    try:
+        with span("archive", "store") as record:
+            run.archived = get_archive().store(run.run_id, inputs,
+                                               [structure_output(output) for output in result.tasks_output],
+                                               partial=partial, tenant=run.tenant)
+            record.update(run.archived)
+    except Exception as e:
+        print(f"⚠️ Could not archive plan {run.run_id}: {e}")
+
+
+def _load_result(payload: str) -> CrewOutput:
+    result = CrewOutput.model_validate_json(payload)
+    for output in result.tasks_output:
+        structure_output(output)
+    result.pydantic = result.tasks_output[-1].pydantic
+    return result
+
+
+def _replay(result: CrewOutput, on_task_output: Optional[Callable]) -> CrewOutput:
+    if on_task_output is not None:
+        for output in result.tasks_output:
+            on_task_output(output)
+    return result
+
+
+def _find_similar(inputs: dict, tenant: str, task_fields: Dict[str, Set[str]]
+                  ) -> Optional[Tuple[float, CrewOutput, Dict[str, float], Optional[Set[str]]]]:
+    """``tenant``'s most similar earlier submission whose plan can be reused, or some of its tasks kept.
+
+    Returns its score, plan, field scores and the tasks to keep (None: the
+    whole plan is reused). ``task_fields`` names the input fields each task's
+    prompts reference; a task is never kept when one of them differs.
+    """
+    with span("similarity", "lookup") as record:
+        for score, key, fields in get_similarity_index().nearest(inputs, tenant=tenant):
+            if score < ADAPT_THRESHOLD:
+                break
+            differing = differing_fields(fields)
+            if score >= REUSE_THRESHOLD and not differing:
+                kept = None
+            else:
+                kept = {name for name in ADAPT_KEEP if name in task_fields and not task_fields[name] & differing}
+                if not kept:
+                    continue
+            cached = get_result_cache().get(key)
+            if cached is not None:
+                record["score"] = score
+                return score, _load_result(cached), fields, kept
+    return None
+
+
+def _run_tasks(crew: CrewCopy, template: CrewTemplate, inputs: dict, regenerate: set,
+               on_task_output: Optional[Callable], run: RunContext,
+               seed: Optional[Dict[str, TaskOutput]] = None) -> CrewOutput:
+    """Execute the crew's task graph, reusing memoized task outputs and any ``seed`` outputs by task name."""
+    dag = SCHEDULER == "dag"
+    graph = build_graph(crew, template.tasks_config, with_subtasks=dag)
+    compaction = {name: settings_for(template.tasks_config, name) for name in graph}
+    # Compaction settings change what a task reads, so they are part of its memo key
+    signatures = {name: {**task_signature(node.task), "compaction": compaction[name]}
+                  for name, node in graph.items()}
+    # Regenerating a section also refreshes the research sub-tasks it merges
+    stale = {name for name in graph if name.split(".")[0] in regenerate}
+    # Tasks this run id already completed, e.g. before its worker was killed
+    checkpoints = get_checkpoint_store().load(run.run_id) if CHECKPOINTS_ENABLED else {}
+    budget = None
+    if run.latency_budget:
+        budget = LatencyBudget(run.latency_budget, run.started_at,
+                               [name for name, node in graph.items() if node.top_level])
+    usage = UsageMetrics()
+
+    def task_key(node, settings):
+        # The model and its parameters are part of the key, so a downgraded answer is never served as the full one
+        return task_cache_key({**signatures[node.name], "llm": settings}, inputs, settings["model"],
+                              [context_task.output.raw for context_task in node.task.context], tenant=run.tenant)
+
+    def checkpoint(node, key):
+        if CHECKPOINTS_ENABLED:
+            get_checkpoint_store().save(run.run_id, node.name, key,
+                                        node.task.output.model_dump_json(exclude=TASK_CACHE_EXCLUDE))
+            CHECKPOINTS.inc(event="saved")
+
+    def restore(node, key) -> bool:
+        """Load the task's output from this run's checkpoint or the task cache; False if it has to run."""
+        task = node.task
+        saved = checkpoints.get(node.name)
+        if saved is not None and saved[0] == key:
+            # Checkpoints belong to this run, so they count even for regenerated tasks
+            run.incr("checkpoint.resumed")
+            CHECKPOINTS.inc(event="resumed")
+            task.output = TaskOutput.model_validate_json(saved[1])
+        else:
+            cached = None
+            if CACHE_ENABLED and node.name not in stale:
+                cached = get_task_cache().get(key)
+            if cached is None:
+                return False
+            run.incr("cache.task_hits")
+            task.output = TaskOutput.model_validate_json(cached)
+            checkpoint(node, key)
+        if node.top_level:
+            structure_output(task.output)
+        return True
+
+    def execute(node):
+        task = node.task
+        kept = (seed or {}).get(node.name.split(".")[0])
+        if kept is not None:
+            # Taken from a similar earlier run; its research sub-tasks are skipped with it
+            if node.top_level:
+                task.output = kept
+            return None
+        settings = template.llm_settings[node.name]
+        key = task_key(node, settings)
+        if restore(node, key):
+            return None
+        if budget is not None:
+            parent = None if node.top_level else node.name.split(".")[0]
+            settings, action = budget.plan(node.name, settings,
+                                           parent=(parent, template.llm_settings[parent]) if parent else None)
+            if action is not None:
+                run.budget_action(node.name, action, settings)
+                run.incr(f"budget.{action}")
+                BUDGET_ACTIONS.inc(action=action)
+                if action == "skipped":
+                    task.output = TaskOutput(name=node.name, description=task.description,
+                                             agent=task.agent.role, raw=SKIPPED_NOTE)
+                    return None
+                key = task_key(node, settings)
+                if restore(node, key):
+                    return None
+        run.check()
+        task.agent.llm = llm_for(settings, run.api_key)
+        if settings.get("trimmed"):
+            task.description += TRIM_NOTE
+        # Upstream tasks already carry their outputs, which the step crew
+        # reads as context exactly as a full sequential kickoff would.
+        with span("task", node.name, TASK_SECONDS, {"task": node.name}, agent=task.agent.role.strip(),
+                  tier=settings["tier"], model=settings["model"]) as record:
+            context = None
+            if compaction[node.name] is not None and task.context:
+                brief = compact_context([(t.name, t.output.raw) for t in task.context], compaction[node.name],
+                                        needs=task.description)
+                context = brief.text
+                record.update(context_tokens=brief.tokens, context_full_tokens=brief.full_tokens)
+                CONTEXT_TOKENS.inc(brief.full_tokens, kind="full")
+                CONTEXT_TOKENS.inc(brief.tokens, kind="compacted")
+                run.incr("context.full_tokens", brief.full_tokens)
+                run.incr("context.compacted_tokens", brief.tokens)
+            step = StepCrew(agents=[task.agent], tasks=[task], process=crew.process, verbose=crew.verbose,
+                            context_override=context)
+            step.kickoff(inputs=inputs)
+        task_times.observe(node.name, settings, record["duration"])
+        if node.top_level:
+            structure_output(task.output)
+        if CACHE_ENABLED:
+            get_task_cache().set(key, task.output.model_dump_json(exclude=TASK_CACHE_EXCLUDE))
+        checkpoint(node, key)
+        return step.usage_metrics
+
+    def on_done(node, step_usage):
+        if budget is not None and node.top_level:
+            budget.done(node.name)
+        if step_usage is not None:
+            usage.add_usage_metrics(step_usage)
+        if node.top_level and on_task_output is not None:
+            on_task_output(node.task.output)
+
+    try:
+        run_graph(graph, execute, on_done, parallelism=DAG_PARALLELISM if dag else 1,
+                  stop=lambda: run.cancel(FAILED))
+    except RunCancelled as e:
+        # Hand back whatever was finished, e.g. the business plan when the deadline hit during the MVP plan
+        finished = [task.output for task in crew.tasks if task.output is not None]
+        if finished:
+            e.partial = _crew_output(finished, usage)
+        raise
+    return _crew_output([task.output for task in crew.tasks], usage)
+
+
+def _crew_output(outputs, usage: UsageMetrics) -> CrewOutput:
+    final = outputs[-1]
+    return CrewOutput(raw=final.raw, pydantic=final.pydantic, json_dict=final.json_dict,
+                      tasks_output=outputs, token_usage=usage)
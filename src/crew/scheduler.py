@@ -0,0 +1,119 @@
+"""Dependency-graph scheduling of crew tasks and their research sub-tasks."""
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from crewai import Task
+
+# "sequential" runs the three tasks one after another, exactly like
+# Process.sequential. "dag" also runs the sub-tasks declared under
+# ``subtasks:`` in tasks.yaml, and sections build on each other's research
+# notes instead of the finished sections, so all of them are written at once.
+SCHEDULER = os.getenv("CREW_SCHEDULER", "sequential")
+DAG_PARALLELISM = int(os.getenv("CREW_DAG_PARALLELISM", "4"))
+
+
+@dataclass
+class Node:
+    name: str
+    task: Task
+    deps: List[str] = field(default_factory=list)
+    top_level: bool = True
+
+
+def build_graph(crew, tasks_config: Dict[str, Any], with_subtasks: bool) -> Dict[str, Node]:
+    """Turn the crew's tasks (and optionally their sub-tasks) into graph nodes.
+
+    Every task's ``context`` is made explicit, so the graph edges and the
+    context an agent reads are always the same thing. A task with sub-tasks
+    becomes their merge step: it receives their outputs as extra context,
+    searches no further itself and still produces the section it always did.
+    A task building on a section with sub-tasks reads those sub-tasks' notes
+    in its place, so the sections no longer wait for one another and the
+    longest path is one chain of sub-tasks plus one section.
+    """
+    nodes: Dict[str, Node] = {}
+    notes: Dict[str, List[Task]] = {}  # Sub-tasks of each section, read in place of the section
+    for index, task in enumerate(crew.tasks):
+        upstream = list(task.context) if isinstance(task.context, list) else list(crew.tasks[:index])
+        subtasks = {}
+        if with_subtasks:
+            subtasks = (tasks_config.get(task.name) or {}).get("subtasks") or {}
+            upstream = [note for context_task in upstream for note in notes.get(context_task.name, [context_task])]
+
+        sub_nodes = {}
+        for sub_name, sub_config in subtasks.items():
+            sub_task = Task(
+                name=f"{task.name}.{sub_name}",
+                description=sub_config["description"],
+                expected_output=sub_config["expected_output"],
+                # Sub-tasks run concurrently, so each needs its own agent executor
+                agent=task.agent.copy(),
+                callback=task.callback,
+            )
+            sub_nodes[sub_name] = Node(sub_task.name, sub_task, top_level=False)
+        for sub_name, sub_config in subtasks.items():
+            node = sub_nodes[sub_name]
+            node.deps = [sub_nodes[dep].name for dep in sub_config.get("depends_on", [])]
+            node.task.context = [sub_nodes[dep].task for dep in sub_config.get("depends_on", [])]
+            nodes[node.name] = node
+
+        if sub_nodes:
+            notes[task.name] = [node.task for node in sub_nodes.values()]
+            # Its research is done by the sub-tasks; the merge step only writes
+            task.agent = task.agent.copy()
+            task.agent.tools = []
+        task.context = upstream + [node.task for node in sub_nodes.values()]
+        nodes[task.name] = Node(task.name, task, deps=[t.name for t in task.context])
+    return nodes
+
+
+def run_graph(nodes: Dict[str, Node], execute: Callable[[Node], Any],
+              on_done: Callable[[Node, Any], None], parallelism: int = 1,
+              stop: Callable[[], Any] = lambda: None) -> None:
+    """Run each node once its dependencies have finished.
+
+    ``execute`` runs on worker threads (inline when ``parallelism`` is 1) with
+    the caller's context variables; ``on_done`` always runs on the calling
+    thread, in completion order, with the value ``execute`` returned. The
+    first failure is re-raised once the other nodes are settled: those not
+    started are cancelled, and ``stop`` is called to halt the running ones.
+    """
+    pending = dict(nodes)
+    finished = set()
+
+    def ready() -> List[Node]:
+        return [node for node in pending.values() if all(dep in finished for dep in node.deps)]
+
+    if parallelism <= 1:
+        while pending:
+            batch = ready()
+            if not batch:
+                raise ValueError(f"Task graph has unsatisfiable dependencies: {sorted(pending)}")
+            node = pending.pop(batch[0].name)
+            on_done(node, execute(node))
+            finished.add(node.name)
+        return
+
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="crew-dag") as pool:
+        running = {}
+        while pending or running:
+            for node in ready():
+                del pending[node.name]
+                context = contextvars.copy_context()
+                running[pool.submit(context.run, execute, node)] = node
+            if not running:
+                raise ValueError(f"Task graph has unsatisfiable dependencies: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                try:
+                    on_done(node, future.result())
+                except BaseException:
+                    for other in running:
+                        other.cancel()
+                    stop()
+                    raise  # Leaving the pool waits for the running nodes to stop
+                finished.add(node.name)
@@ -0,0 +1,228 @@
+"""Nearest-neighbour lookup of past submissions, so near-duplicate ideas can reuse a plan.
+
+Inputs are turned into fixed-size vectors by a hashing vectorizer (words,
+word pairs and character trigrams; no model and no network), one block per
+input field, weighted so a dot product is the weighted cosine similarity of
+the fields. Lexical scores cannot tell a rephrased idea from a different one
+that shares its words, so every field must also clear its own minimum
+(``CREW_SIMILARITY_FIELD_MIN``): the market and team practically verbatim,
+the idea at a level calibrated on ``bench/similarity_pairs.jsonl`` with
+``bench/similarity_calibration.py``. Vectors live in a memory-mapped float32
+matrix next to the caches, with a SQLite row per vector pointing at the
+run's result-cache key and naming its tenant. Runs are appended as they
+finish, and every worker on the host reads the same file; a lookup is one
+matrix-vector product over the rows of the asking tenant.
+"""
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from src.crew.cache import INPUT_FIELDS, PLACEHOLDER, normalize_text
+from src.crew.metrics import SIMILARITY_LOOKUP_SECONDS
+from src.crew.run_context import DEFAULT_TENANT
+from src.crew.storage import DATA_DIR, add_column, connect
+
+SIMILARITY_ENABLED = os.getenv("CREW_SIMILARITY", "true").lower() in ("1", "true", "yes")
+# At or above REUSE the stored plan is returned as is; between ADAPT and REUSE the
+# tasks in KEEP are reused and the rest re-run on the new inputs. Either way only
+# tasks whose prompts reference no field below its minimum are taken over. No task
+# is kept by default: the lexical score cannot vouch for a plan at adapt levels, and
+# every shipped task references all input fields, so adapting needs tasks that do not.
+REUSE_THRESHOLD = float(os.getenv("CREW_SIMILARITY_REUSE", "0.9"))
+ADAPT_THRESHOLD = float(os.getenv("CREW_SIMILARITY_ADAPT", "0.7"))
+ADAPT_KEEP = tuple(name.strip() for name in os.getenv("CREW_SIMILARITY_KEEP", "").split(",") if name.strip())
+INDEX_PATH = os.getenv("CREW_SIMILARITY_PATH", str(DATA_DIR / "similarity"))
+
+FIELD_DIM = 512
+FIELD_WEIGHTS = {"startup_idea": 0.6, "target_market": 0.25, "team_composition": 0.15}
+VECTOR_DIM = FIELD_DIM * len(INPUT_FIELDS)
+ROW_BYTES = VECTOR_DIM * 4
+TOKEN = re.compile(r"[a-z0-9]+(?:[-+.][a-z0-9]+)*")  # Keeps "k-12", "b2b", "node.js" whole
+STOPWORDS = frozenset("a an and are as at be by for from in is it of on or our that the their this to we with "
+                      "who will can".split())
+
+
+def _parse_minimums(spec: str) -> Dict[str, float]:
+    """``"startup_idea=0.9"`` -> the default minimums with that field's replaced."""
+    minimums = {"startup_idea": 0.86, "target_market": 0.98, "team_composition": 0.98}
+    for item in spec.split(","):
+        field, _, minimum = item.partition("=")
+        if field.strip() in minimums:
+            minimums[field.strip()] = float(minimum)
+    return minimums
+
+
+# Per-field cosine below which two submissions differ in that field
+FIELD_MINIMUMS = _parse_minimums(os.getenv("CREW_SIMILARITY_FIELD_MIN", ""))
+
+
+def _hash(feature: str) -> Tuple[int, float]:
+    digest = zlib.crc32(feature.encode())  # Stable across processes, unlike hash()
+    return digest % FIELD_DIM, -1.0 if digest & 0x80000000 else 1.0
+
+
+def _field_vector(text: str) -> np.ndarray:
+    vector = np.zeros(FIELD_DIM, dtype=np.float32)
+    words = [word for word in TOKEN.findall(normalize_text(text)) if word not in STOPWORDS]
+    features = []
+    for i, word in enumerate(words):
+        features.append((f"w:{word}", 1.0))
+        if i:
+            features.append((f"b:{words[i - 1]} {word}", 0.25))
+        padded = f" {word} "
+        # Trigrams match "app" with "apps" and "tutor" with "tutoring"
+        features.extend((f"c:{padded[j:j + 3]}", 0.35) for j in range(len(padded) - 2))
+    for feature, weight in features:
+        index, sign = _hash(feature)
+        vector[index] += sign * weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def vectorize(inputs: Dict) -> np.ndarray:
+    """Unit-length vector of a submission; the dot product of two is their weighted field similarity."""
+    return np.concatenate([_field_vector(inputs.get(field, "")) * np.float32(np.sqrt(FIELD_WEIGHTS[field]))
+                           for field in INPUT_FIELDS])
+
+
+def field_scores(vector: np.ndarray, other: np.ndarray) -> Dict[str, float]:
+    """Cosine similarity of each input field of two ``vectorize`` vectors."""
+    return {field: round(float(vector[i * FIELD_DIM:(i + 1) * FIELD_DIM] @ other[i * FIELD_DIM:(i + 1) * FIELD_DIM])
+                         / FIELD_WEIGHTS[field], 4)
+            for i, field in enumerate(INPUT_FIELDS)}
+
+
+def differing_fields(scores: Dict[str, float]) -> Set[str]:
+    """Fields whose similarity is below their minimum, i.e. that differ between two submissions."""
+    return {field for field, score in scores.items() if score < FIELD_MINIMUMS[field]}
+
+
+def referenced_fields(task_config: Dict) -> Set[str]:
+    """Input fields the prompts of a task from tasks.yaml, or of its sub-tasks, reference."""
+    configs: Iterable[Dict] = [task_config, *(task_config.get("subtasks") or {}).values()]
+    text = " ".join(str(config.get(key, "")) for config in configs for key in ("description", "expected_output"))
+    return set(PLACEHOLDER.findall(text)) & set(INPUT_FIELDS)
+
+
+class SimilarityIndex:
+    """Append-only vector index on disk, shared by all processes on the host."""
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.db_path = f"{path}.sqlite3"
+        self.matrix_path = Path(f"{path}.f32")
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self.last_lookup_seconds = 0.0
+        with closing(connect(self.db_path)) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                " row INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, inputs TEXT NOT NULL, created_at REAL NOT NULL,"
+                " tenant TEXT NOT NULL DEFAULT 'default')"
+            )
+            add_column(conn, "vectors", "tenant", "TEXT NOT NULL DEFAULT 'default'")
+            conn.execute("CREATE INDEX IF NOT EXISTS vectors_tenant ON vectors (tenant)")
+
+    def add(self, inputs: Dict, key: str, tenant: str = DEFAULT_TENANT) -> bool:
+        """Index ``tenant``'s submission whose result is cached under ``key``; False if it already is."""
+        vector = vectorize(inputs)
+        with closing(connect(self.db_path)) as conn:
+            conn.execute("BEGIN IMMEDIATE")  # One writer at a time across processes
+            try:
+                if conn.execute("SELECT 1 FROM vectors WHERE key = ?", (key,)).fetchone() is not None:
+                    conn.execute("ROLLBACK")
+                    return False
+                row = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+                self._write(row, vector)
+                conn.execute("INSERT INTO vectors VALUES (?, ?, ?, ?, ?)",
+                             (row, key, json.dumps({field: inputs.get(field, "") for field in INPUT_FIELDS}),
+                              time.time(), tenant))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def nearest(self, inputs: Dict, limit: int = 3,
+                tenant: str = DEFAULT_TENANT) -> List[Tuple[float, str, Dict[str, float]]]:
+        """``tenant``'s ``limit`` most similar submissions as ``(score, result key, field scores)``, best first."""
+        started = time.perf_counter()
+        vector = vectorize(inputs)
+        with closing(connect(self.db_path)) as conn:
+            rows, keys = [], {}
+            for row, key in conn.execute("SELECT row, key FROM vectors WHERE tenant = ?", (tenant,)):
+                rows.append(row)
+                keys[row] = key
+            matches = []
+            if rows:
+                rows = np.array(rows)
+                matrix = self._view(int(rows.max()) + 1)[rows]
+                scores = matrix @ vector
+                top = np.argsort(-scores)[:limit] if len(rows) <= limit else np.argpartition(-scores, limit)[:limit]
+                top = sorted(top, key=lambda i: -scores[i])
+                matches = [(round(float(scores[i]), 4), keys[int(rows[i])], field_scores(vector, matrix[i]))
+                           for i in top]
+        elapsed = time.perf_counter() - started
+        SIMILARITY_LOOKUP_SECONDS.observe(elapsed)
+        with self._lock:
+            self.lookups += 1
+            self.lookup_seconds += elapsed
+            self.last_lookup_seconds = elapsed
+        return matches
+
+    def stats(self) -> Dict[str, object]:
+        with closing(connect(self.db_path)) as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {
+            "entries": rows,
+            "dimensions": VECTOR_DIM,
+            "size_bytes": self.matrix_path.stat().st_size if self.matrix_path.exists() else 0,
+            "lookups": self.lookups,
+            "avg_lookup_ms": round(self.lookup_seconds / self.lookups * 1000, 3) if self.lookups else 0.0,
+            "last_lookup_ms": round(self.last_lookup_seconds * 1000, 3),
+            "reuse_threshold": REUSE_THRESHOLD,
+            "adapt_threshold": ADAPT_THRESHOLD,
+            "field_minimums": FIELD_MINIMUMS,
+            "adapt_keep": list(ADAPT_KEEP),
+        }
+
+    def _write(self, row: int, vector: np.ndarray) -> None:
+        self.matrix_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.matrix_path, "a+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size < (row + 1) * ROW_BYTES:
+                # Grow by doubling so the file is remapped rarely
+                f.truncate(max((row + 1) * ROW_BYTES, 2 * size, 64 * ROW_BYTES))
+        with open(self.matrix_path, "r+b") as f:
+            f.seek(row * ROW_BYTES)
+            f.write(vector.astype(np.float32).tobytes())
+
+    def _view(self, rows: int) -> np.ndarray:
+        """Read-only map of the matrix holding at least ``rows`` rows, remapped when the file grew."""
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[0] < rows:
+                capacity = self.matrix_path.stat().st_size // ROW_BYTES
+                self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(capacity, VECTOR_DIM))
+            return self._matrix
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SimilarityIndex()
+    return _index
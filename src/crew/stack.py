@@ -0,0 +1,70 @@
+"""Deferred loading of the crew stack (crewai, litellm, crewai_tools).
+
+Importing the stack takes several seconds, so the API and UI import this
+module instead and pull the stack in on first use, from a background warmup
+thread, or once in a preforked gunicorn master (``CREW_PRELOAD``).
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+# Load the stack while the app module is imported. Combined with gunicorn's
+# --preload this pays the import cost once in the master instead of per worker.
+PRELOAD = os.getenv("CREW_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+_loaded = threading.Event()
+_lock = threading.Lock()
+_error: Optional[BaseException] = None
+_load_seconds: Optional[float] = None
+_started_at = time.time()
+
+
+def load():
+    """Import the crew stack and build the crew template; returns the runner module."""
+    global _error, _load_seconds
+    if not _loaded.is_set():
+        with _lock:
+            if not _loaded.is_set():
+                started = time.perf_counter()
+                try:
+                    from src.crew import runner
+                    from src.crew.template import get_crew_template
+
+                    get_crew_template()
+                except BaseException as e:
+                    _error = e
+                    raise
+                _error = None
+                _load_seconds = time.perf_counter() - started
+                _loaded.set()
+    from src.crew import runner
+
+    return runner
+
+
+def warm_up() -> threading.Thread:
+    """Start loading the stack on a daemon thread so the first request does not pay for it."""
+
+    def target():
+        try:
+            load()
+        except Exception as e:
+            print(f"⚠️ Crew stack failed to load: {e}")
+
+    thread = threading.Thread(target=target, name="crew-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return _loaded.is_set()
+
+
+def status() -> dict:
+    return {
+        "ready": is_ready(),
+        "load_seconds": round(_load_seconds, 3) if _load_seconds is not None else None,
+        "uptime_seconds": round(time.time() - _started_at, 3),
+        "error": str(_error) if _error is not None else None,
+    }
@@ -0,0 +1,30 @@
+"""Local SQLite storage shared by all processes on the host."""
+import os
+import sqlite3
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Every gunicorn worker and the Streamlit process open the same files here
+DATA_DIR = Path(os.getenv("CREW_DATA_DIR", str(PROJECT_ROOT / ".crew_data")))
+
+
+def connect(path) -> sqlite3.Connection:
+    """Open a SQLite database that several processes can read and write concurrently."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    """Add ``column`` to a table created by an earlier version, if it is missing."""
+    if column in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+        return
+    try:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    except sqlite3.OperationalError as e:
+        if "duplicate column" not in str(e):  # Another process added it first
+            raise
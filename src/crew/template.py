@@ -0,0 +1,78 @@
+"""Prebuilt crew definition that every run copies instead of rebuilding."""
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Mapping, Tuple
+
+from crewai import Agent, Process, Task
+
+from src.crew.ene_crew import EntrepreneurshipCrew, load_config
+from src.crew.tiers import all_task_settings
+
+
+@dataclass
+class CrewCopy:
+    """The per-run, mutable copy of the crew's agents and tasks."""
+    agents: List[Agent]
+    tasks: List[Task]
+    process: Process
+    verbose: bool
+
+
+@dataclass(frozen=True)
+class CrewTemplate:
+    """Agents and tasks built once per process from the validated configs.
+
+    The template itself is never executed. ``instantiate`` hands each run its
+    own agents and tasks (with context links remapped), which is all a run
+    mutates, so concurrent runs stay isolated without rebuilding the crew,
+    re-reading YAML or re-creating the LLM client.
+    """
+    agents: Tuple[Agent, ...]
+    tasks: Tuple[Task, ...]
+    process: Process
+    verbose: bool
+    tasks_config: Mapping
+    llm_settings: Mapping  # Per task and "task.sub-task": tier, model, max_tokens, temperature
+    model: str
+
+    @classmethod
+    def build(cls, crew_instance: EntrepreneurshipCrew) -> "CrewTemplate":
+        crew = crew_instance.crew()
+        return cls(
+            agents=tuple(crew.agents),
+            tasks=tuple(crew.tasks),
+            process=crew.process,
+            verbose=crew.verbose,
+            tasks_config=MappingProxyType(crew_instance.tasks_config),
+            llm_settings=MappingProxyType(all_task_settings(load_config('agents.yaml'), load_config('tasks.yaml'))),
+            model=crew_instance.llm.model,
+        )
+
+    @property
+    def task_names(self) -> List[str]:
+        return [task.name for task in self.tasks]
+
+    def instantiate(self) -> CrewCopy:
+        agents = [agent.copy() for agent in self.agents]
+        task_mapping = {}
+        tasks = []
+        for task in self.tasks:
+            copied = task.copy(agents, task_mapping)
+            task_mapping[task.key] = copied
+            tasks.append(copied)
+        return CrewCopy(agents=agents, tasks=tasks, process=self.process, verbose=self.verbose)
+
+
+_template = None
+_lock = threading.Lock()
+
+
+def get_crew_template() -> CrewTemplate:
+    """Return the process-wide crew template, building it on first use."""
+    global _template
+    if _template is None:
+        with _lock:
+            if _template is None:
+                _template = CrewTemplate.build(EntrepreneurshipCrew())
+    return _template
@@ -0,0 +1,208 @@
+"""Model tiers for agents and tasks, and the per-run latency budget that steps them down.
+
+Agents in agents.yaml and tasks (and sub-tasks) in tasks.yaml may carry an
+``llm_settings`` block with ``tier``, ``model``, ``max_tokens`` and
+``temperature``; a task's block overrides its agent's. The ``quality`` tier
+is ``CREW_LLM_MODEL`` and the ``fast`` tier ``CREW_LLM_FAST_MODEL``, which
+research sub-tasks use unless they say otherwise (``CREW_RESEARCH_TIER``).
+
+With a latency budget (``CREW_LATENCY_BUDGET`` or per request), each task
+gets an even share of the time left. A task not expected to finish within
+its share runs on the fast tier; if even that is too slow, its answer is
+capped at ``CREW_LLM_TRIM_MAX_TOKENS`` and research sub-tasks are skipped.
+Expectations come from how long the task took on that model in this process.
+
+Clients come from a pool keyed by settings and the run's API key, so runs
+with different keys never share one and idle clients are released.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.crew.llm import LLM_BASE_URL, LLM_MODEL, CopilotLLM
+from src.crew.run_context import credential_id
+
+FAST_MODEL = os.getenv("CREW_LLM_FAST_MODEL", "gemini/gemini-2.0-flash-lite")
+FAST_BASE_URL = os.getenv("CREW_LLM_FAST_BASE_URL") or LLM_BASE_URL
+TIERS = {
+    "quality": {"model": LLM_MODEL, "base_url": LLM_BASE_URL},
+    "fast": {"model": FAST_MODEL, "base_url": FAST_BASE_URL},
+}
+DEFAULT_TIER = "quality"
+RESEARCH_TIER = os.getenv("CREW_RESEARCH_TIER", "fast")
+SETTING_KEYS = ("tier", "model", "max_tokens", "temperature")
+
+TRIM_MAX_TOKENS = int(os.getenv("CREW_LLM_TRIM_MAX_TOKENS", "1024"))
+TRIM_NOTE = ("\n\nTime is short: keep the answer brief and cover only the most important sections, "
+             "in at most a few hundred words.")
+SKIPPED_NOTE = "(Research skipped to stay within the run's latency budget.)"
+# Clients per settings and API key are kept until unused for this long
+POOL_IDLE_SECONDS = float(os.getenv("CREW_LLM_POOL_IDLE", "900"))
+POOL_MAX_SIZE = int(os.getenv("CREW_LLM_POOL_SIZE", "256"))
+# Expected task duration on a tier until this process has timed the task on it
+ESTIMATES = {
+    "quality": float(os.getenv("CREW_TASK_ESTIMATE_SECONDS", "60")),
+    "fast": float(os.getenv("CREW_FAST_TASK_ESTIMATE_SECONDS", "20")),
+}
+
+
+def resolve(*layers: Optional[Dict]) -> Dict:
+    """Merge ``llm_settings`` blocks, later ones winning, into the settings a task runs with."""
+    merged = {"tier": DEFAULT_TIER}
+    for layer in layers:
+        merged.update({key: value for key, value in (layer or {}).items() if key in SETTING_KEYS})
+    return {
+        "tier": merged["tier"],
+        "model": merged.get("model") or TIERS[merged["tier"]]["model"],
+        "max_tokens": merged.get("max_tokens"),
+        "temperature": merged.get("temperature"),
+    }
+
+
+def all_task_settings(agents_config: Dict, tasks_config: Dict) -> Dict[str, Dict]:
+    """LLM settings of every task and ``task.sub-task`` in the YAML configs.
+
+    Research sub-tasks default to ``RESEARCH_TIER`` instead of their agent's tier.
+    """
+    settings = {}
+    for name, task_config in tasks_config.items():
+        agent_settings = (agents_config.get(task_config["agent"]) or {}).get("llm_settings")
+        settings[name] = resolve(agent_settings, task_config.get("llm_settings"))
+        for sub_name, sub_config in (task_config.get("subtasks") or {}).items():
+            settings[f"{name}.{sub_name}"] = resolve(agent_settings, {"tier": RESEARCH_TIER, "model": None},
+                                                      sub_config.get("llm_settings"))
+    return settings
+
+
+def downgrade(settings: Dict) -> Dict:
+    return {**settings, "tier": "fast", "model": TIERS["fast"]["model"]}
+
+
+def trim(settings: Dict) -> Dict:
+    return {**settings, "max_tokens": min(settings["max_tokens"] or TRIM_MAX_TOKENS, TRIM_MAX_TOKENS),
+            "trimmed": True}
+
+
+def tier_models() -> Dict[str, str]:
+    return {tier: config["model"] for tier, config in TIERS.items()}
+
+
+class ClientPool:
+    """LLM clients reused across runs, keyed by settings and API key.
+
+    Clients idle for ``idle_seconds`` are dropped, least recently used
+    first, as are the oldest ones beyond ``max_size``; a run still holding
+    an evicted client keeps using it, and the next run gets a new one.
+    """
+
+    def __init__(self, idle_seconds: float = POOL_IDLE_SECONDS, max_size: int = POOL_MAX_SIZE):
+        self.idle_seconds = idle_seconds
+        self.max_size = max_size
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self._clients: "OrderedDict[Tuple, Tuple[CopilotLLM, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, settings: Dict, api_key: Optional[str] = None) -> CopilotLLM:
+        credential = credential_id(api_key)
+        key = (settings["tier"], settings["model"], settings["max_tokens"], settings["temperature"], credential)
+        now = time.time()
+        with self._lock:
+            entry = self._clients.pop(key, None)
+            if entry is None:
+                llm = CopilotLLM(model=settings["model"], base_url=TIERS[settings["tier"]]["base_url"],
+                                 max_tokens=settings["max_tokens"], temperature=settings["temperature"],
+                                 api_key=api_key)
+                llm.tier = settings["tier"]
+                llm.credential = credential
+                self.created += 1
+            else:
+                llm = entry[0]
+                self.reused += 1
+            self._clients[key] = (llm, now)  # Most recently used last
+            self._evict(now)
+        return llm
+
+    def _evict(self, now: float) -> None:
+        while self._clients:
+            key, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used <= self.idle_seconds and len(self._clients) <= self.max_size:
+                break
+            del self._clients[key]
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._evict(time.time())
+            credentials = {key[-1] for key in self._clients}
+            return {"clients": len(self._clients), "credentials": len(credentials), "created": self.created,
+                    "reused": self.reused, "evicted": self.evicted, "max_size": self.max_size,
+                    "idle_seconds": self.idle_seconds}
+
+
+client_pool = ClientPool()
+
+
+def llm_for(settings: Dict, api_key: Optional[str] = None) -> CopilotLLM:
+    """The shared client for ``settings`` and ``api_key`` (None: the server's key)."""
+    return client_pool.get(settings, api_key)
+
+
+class TaskTimes:
+    """Moving average of each task's duration per model and answer cap, in this process."""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self._seconds: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, task: str, settings: Dict, seconds: float) -> None:
+        key = (task, settings["model"], settings["max_tokens"])
+        with self._lock:
+            previous = self._seconds.get(key)
+            self._seconds[key] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def estimate(self, task: str, settings: Dict) -> float:
+        with self._lock:
+            seconds = self._seconds.get((task, settings["model"], settings["max_tokens"]))
+        return ESTIMATES[settings["tier"]] if seconds is None else seconds
+
+
+task_times = TaskTimes()
+
+
+class LatencyBudget:
+    """Splits what is left of a run's latency budget evenly over the tasks still to run."""
+
+    def __init__(self, seconds: float, started_at: float, tasks: Iterable[str]):
+        self.seconds = seconds
+        self.deadline = started_at + seconds
+        self.pending = set(tasks)
+
+    def allowance(self) -> float:
+        return (self.deadline - time.time()) / max(1, len(self.pending))
+
+    def plan(self, name: str, settings: Dict,
+             parent: Optional[Tuple[str, Dict]] = None) -> Tuple[Dict, Optional[str]]:
+        """The settings to run ``name`` with, and what was given up for them, if anything.
+
+        The action is "downgraded", "trimmed" or, for a research sub-task whose
+        ``parent`` task (name and settings) could then no longer finish in time,
+        "skipped".
+        """
+        allowance = self.allowance()
+        if parent is not None:
+            needed = task_times.estimate(name, settings) + task_times.estimate(parent[0], downgrade(parent[1]))
+            return settings, "skipped" if needed > allowance else None
+        if task_times.estimate(name, settings) <= allowance:
+            return settings, None
+        fast = downgrade(settings)
+        if fast != settings and task_times.estimate(name, fast) <= allowance:
+            return fast, "downgraded"
+        return trim(fast), "trimmed"
+
+    def done(self, name: str) -> None:
+        self.pending.discard(name)
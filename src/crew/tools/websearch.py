@@ -1,17 +1,253 @@
-from crewai_tools import SerperDevTool
-from dotenv import load_dotenv
+import importlib.util
+import json
 import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Type
+
+from crewai.tools import BaseTool
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field, PrivateAttr
+
+from src.crew.cache import ResultCache
+from src.crew.metrics import TOOL_CALLS, TOOL_SECONDS
+from src.crew.run_context import current_run
+from src.crew.tracing import span
 
 # Load environment variables
 load_dotenv()
 
-# Initialize the web search tool
-# This tool uses Serper to perform web searches, which is useful for gathering real-time information
-# Note: SerperDevTool requires SERPER_API_KEY to be set in environment variables
+# All agents share one search tool. Queries are normalized, answered from an
+# in-memory LRU (and optionally a SQLite tier shared by every worker), and
+# concurrent identical queries wait for a single backend request.
+SEARCH_BACKEND = os.getenv("CREW_SEARCH_BACKEND", "serper")
+SEARCH_FIXTURES = os.getenv("CREW_SEARCH_FIXTURES", str(Path(__file__).parent / "fixtures" / "search.json"))
+SEARCH_CACHE_SIZE = int(os.getenv("CREW_SEARCH_CACHE_SIZE", "512"))
+SEARCH_CACHE_TTL = float(os.getenv("CREW_SEARCH_CACHE_TTL", "86400"))
+SEARCH_DISK_CACHE = os.getenv("CREW_SEARCH_DISK_CACHE", "true").lower() in ("1", "true", "yes")
+# Longest an agent waits on another agent's identical query before giving up on it
+COALESCE_TIMEOUT = float(os.getenv("CREW_SEARCH_COALESCE_TIMEOUT", "60"))
+COALESCE_POLL = 1.0  # A waiting run checks for cancellation this often
+
+BUDGET_EXHAUSTED = (
+    "Search budget for this plan is exhausted. Continue with the information "
+    "you have already gathered."
+)
+
+STOPWORDS = {"a", "an", "and", "the", "of", "for", "in", "on", "to", "with", "by", "vs", "versus"}
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: case, punctuation, filler words and word order are ignored."""
+    words = re.sub(r"[^\w\s]", " ", str(query).casefold()).split()
+    return " ".join(sorted({word for word in words if word not in STOPWORDS}))
+
+
+class SerperBackend:
+    """Live Google results through Serper (requires SERPER_API_KEY)."""
+
+    name = "serper"
+
+    def __init__(self):
+        # crewai_tools takes seconds to import, so the client is built on first search
+        if importlib.util.find_spec("crewai_tools") is None:
+            raise ImportError("crewai_tools is not installed")
+        self._tool = None
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> str:
+        if self._tool is None:
+            with self._lock:
+                if self._tool is None:
+                    from crewai_tools import SerperDevTool
+                    self._tool = SerperDevTool()
+        return json.dumps(self._tool.run(search_query=query))
+
+
+class FixtureBackend:
+    """Offline stand-in that answers from a JSON file of canned results.
+
+    The file maps queries to result text under ``"queries"``; lookups use the
+    same normalization as the cache and fall back to the closest entry by word
+    overlap, then to ``"default"``.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path: str = SEARCH_FIXTURES):
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        self.default = data.get("default", "No results found.")
+        self.results = {normalize_query(q): result for q, result in data.get("queries", {}).items()}
+
+    def search(self, query: str) -> str:
+        key = normalize_query(query)
+        if key in self.results:
+            return self.results[key]
+        words = set(key.split())
+        best, overlap = None, 0
+        for candidate, result in self.results.items():
+            shared = len(words & set(candidate.split()))
+            if shared > overlap:
+                best, overlap = result, shared
+        return best if best is not None else self.default
+
 
+BACKENDS = {"serper": SerperBackend, "fixture": FixtureBackend}
+
+
+class SearchQuery(BaseModel):
+    search_query: str = Field(..., description="Mandatory search query you want to use to search the internet")
+
+
+class CachedSearchTool(BaseTool):
+    name: str = "Search the internet"
+    description: str = (
+        "Search the internet for market, competitor and industry information. "
+        "Results for repeated questions are returned from cache."
+    )
+    args_schema: Type[BaseModel] = SearchQuery
+
+    _backend: object = PrivateAttr()
+    _memory: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _disk: Optional[ResultCache] = PrivateAttr(default=None)
+    _inflight: Dict[str, Future] = PrivateAttr(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: Counter = PrivateAttr(default_factory=Counter)
+
+    def __init__(self, backend, disk_cache: Optional[ResultCache] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._backend = backend
+        self._disk = disk_cache
+
+    def _run(self, search_query: str) -> str:
+        with span("tool", self.name, TOOL_SECONDS, {"tool": self.name}, query=search_query) as record:
+            result, source = self._search(search_query)
+            record["source"] = source
+        TOOL_CALLS.inc(tool=self.name, source=source)
+        return result
+
+    def _search(self, search_query: str) -> Tuple[str, str]:
+        """Answer a query; returns the result and where it came from."""
+        run = current_run()
+        key = f"{self._backend.name}:{normalize_query(search_query)}"
+        self._count(run, "queries")
+
+        cached = self._lookup(key)
+        if cached is not None:
+            self._count(run, "cache_hits")
+            return cached, "cache"
+        if run is not None:
+            run.check()  # A cancelled run makes no more backend calls
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            # Another agent is already fetching the same query; share its answer.
+            self._count(run, "coalesced")
+            return self._wait(pending, run, search_query), "coalesced"
+
+        try:
+            if run is not None and run.counters["search.backend_calls"] >= run.search_budget:
+                self._count(run, "budget_exhausted")
+                result, source = BUDGET_EXHAUSTED, "budget_exhausted"
+            else:
+                self._count(run, "backend_calls")
+                result, source = self._backend.search(search_query), self._backend.name
+                self._store(key, result)
+            pending.set_result(result)
+            return result, source
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _wait(self, pending: Future, run, search_query: str) -> str:
+        """The answer of a query fetched by another agent, waited for in short slices.
+
+        The waiting run stops at its cancellation or deadline. Past ``COALESCE_TIMEOUT``, a
+        backend call that hangs is reported to the agent as a timeout.
+        """
+        give_up = time.time() + COALESCE_TIMEOUT
+        while True:
+            timeout = max(0.0, min(COALESCE_POLL, give_up - time.time()))
+            if run is not None:
+                run.check()
+                remaining = run.remaining()
+                if remaining is not None:
+                    timeout = min(timeout, max(0.01, remaining))
+            try:
+                return pending.result(timeout=timeout)
+            except FutureTimeout:
+                if pending.done():
+                    raise  # The other agent's search itself timed out
+                if time.time() >= give_up:
+                    raise TimeoutError(f"Search for {search_query!r} timed out after {COALESCE_TIMEOUT:.0f}s")
+
+    def stats(self) -> Dict[str, float]:
+        """Process-wide search counters since startup."""
+        stats = dict(self._stats)
+        queries = stats.get("queries", 0)
+        stats["hit_rate"] = stats.get("cache_hits", 0) / queries if queries else 0.0
+        stats["backend"] = self._backend.name
+        return stats
+
+    def _lookup(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return result
+                del self._memory[key]
+        if self._disk is not None:
+            result = self._disk.get(key)
+            if result is not None:
+                self._remember(key, result, now)
+                return result
+        return None
+
+    def _store(self, key: str, result: str) -> None:
+        self._remember(key, result, time.time())
+        if self._disk is not None:
+            self._disk.set(key, result)
+
+    def _remember(self, key: str, result: str, now: float) -> None:
+        with self._lock:
+            self._memory[key] = (now + SEARCH_CACHE_TTL, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > SEARCH_CACHE_SIZE:
+                self._memory.popitem(last=False)
+
+    def _count(self, run, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+        if run is not None:
+            run.incr(f"search.{name}")
+
+
+# Initialize the web search tool
+# Serper performs live web searches (SERPER_API_KEY must be set); set
+# CREW_SEARCH_BACKEND=fixture to answer from local fixtures in tests and offline.
 try:
-    web_search_tool = SerperDevTool()
+    web_search_tool = CachedSearchTool(
+        backend=BACKENDS[SEARCH_BACKEND](),
+        disk_cache=ResultCache("search_results", ttl=SEARCH_CACHE_TTL) if SEARCH_DISK_CACHE else None,
+    )
 except Exception as e:
-    # If SerperDevTool fails to initialize, create a fallback
-    print(f"Warning: Could not initialize SerperDevTool: {e}")
-    web_search_tool = None
\ No newline at end of file
+    # If the search backend fails to initialize, create a fallback
+    print(f"Warning: Could not initialize {SEARCH_BACKEND} search backend: {e}")
+    web_search_tool = None
@@ -0,0 +1,106 @@
+"""Timed spans for runs, tasks, LLM calls and tool calls.
+
+Spans are plain dicts appended to the current ``RunContext``, so recording
+one costs a couple of clock reads and a list append. They feed the latency
+histograms in ``metrics`` and, with ``CREW_TRACE_DIR`` set, a JSON trace per
+run.
+"""
+import itertools
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.crew.metrics import AGENT_STEPS, Histogram
+from src.crew.run_context import RunContext, current_run
+
+TRACE_DIR = os.getenv("CREW_TRACE_DIR") or None
+
+_span_ids = itertools.count(1)
+_current_span: ContextVar[Optional[Dict]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(kind: str, name: str, histogram: Optional[Histogram] = None, labels: Optional[Dict] = None,
+         **attributes):
+    """Time the block as a span of the current run; yields the span so callers can add attributes.
+
+    When ``histogram`` is given, the duration is also observed with ``labels``.
+    """
+    run = current_run()
+    parent = _current_span.get()
+    record = {
+        "id": next(_span_ids),
+        "parent": parent["id"] if parent else None,
+        "kind": kind,
+        "name": name,
+        # The task a span belongs to, so step and tool events can be attributed
+        "task": name if kind == "task" else (parent or {}).get("task"),
+        "start": round(time.time() - run.started_at, 6) if run is not None else time.time(),
+        **attributes,
+    }
+    token = _current_span.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration"] = round(time.perf_counter() - started, 6)
+        _current_span.reset(token)
+        if histogram is not None:
+            histogram.observe(record["duration"], **(labels or {}))
+        if run is not None:
+            run.add_span(record)
+
+
+def current_span() -> Optional[Dict]:
+    return _current_span.get()
+
+
+def on_agent_step(step) -> None:
+    """Agent ``step_callback``: count reasoning steps and tool calls, and stop a cancelled run."""
+    if hasattr(step, "tool"):
+        kind = "tool"  # AgentAction: the agent chose a tool, which has run by now
+    elif hasattr(step, "output"):
+        kind = "finish"  # AgentFinish: the agent's final answer
+    else:
+        return  # ToolResult repeats the preceding action's tool call
+    task_span = _current_span.get()
+    task = task_span["task"] if task_span else None
+    AGENT_STEPS.inc(task=task or "", kind=kind)
+    if task_span is not None:
+        task_span["steps"] = task_span.get("steps", 0) + 1
+        if kind == "tool":
+            task_span["tool_calls"] = task_span.get("tool_calls", 0) + 1
+    run = current_run()
+    if run is not None:
+        run.incr("agent.steps")
+        if kind == "tool":
+            run.incr("agent.tool_calls")
+        run.check()
+
+
+def on_task_complete(output) -> None:
+    """Task ``callback``: record the size of the task's output on its span."""
+    task_span = _current_span.get()
+    if task_span is not None:
+        task_span["output_chars"] = len(output.raw or "")
+
+
+def write_trace(run: RunContext) -> Optional[Path]:
+    """Write the run's report and spans to ``CREW_TRACE_DIR/<run_id>.json`` if tracing is enabled."""
+    if TRACE_DIR is None:
+        return None
+    path = Path(TRACE_DIR) / f"{run.run_id}.json"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({**run.report(), "spans": run.spans}, default=str, indent=2))
+    except OSError as e:
+        print(f"⚠️ Could not write trace for run {run.run_id}: {e}")
+        return None
+    return path
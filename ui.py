@@ -1,21 +1,397 @@
-__import__('pysqlite3')
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
-sys.modules["sqlite3.dbapi2"] = sys.modules["pysqlite3.dbapi2"]
 import streamlit as st
 import sys
 import os
+from datetime import datetime
 from pathlib import Path
 
 # Add src to path
 src_dir = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_dir))
 
-try:
-    from src.crew.ene_crew import EntrepreneurshipCrew
-except ImportError:
-    st.error("❌ Import error. Please install dependencies with: pip install -e .")
-    st.stop()
+# Lightweight; crewai and the rest of the crew stack are only imported by stack.load()
+from src.crew import stack
+from src.crew.run_context import RunCancelled, RunContext
+
+# Finished plans kept per browser session; older ones are dropped first
+UI_HISTORY = int(os.getenv("CREW_UI_HISTORY", "10"))
+# Seconds a plan may take before the sections finished so far are shown instead (0 = no limit)
+UI_DEADLINE = float(os.getenv("CREW_UI_DEADLINE", "0"))
+
+
+def session_gone():
+    """Callable telling whether this browser session has closed, so its run can stop early"""
+    from streamlit import runtime
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None or not runtime.exists():
+        return None
+    instance, session_id = runtime.get_instance(), ctx.session_id
+    return lambda: not instance.is_active_session(session_id)
+
+
+def use_pysqlite3():
+    """Swap in pysqlite3 for the system SQLite before the crew stack imports it"""
+    if 'pysqlite3' not in sys.modules:
+        __import__('pysqlite3')
+        sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+        sys.modules["sqlite3.dbapi2"] = sys.modules["pysqlite3.dbapi2"]
+
+
+@st.cache_resource
+def start_crew_warmup():
+    """Load the crew stack in the background while the user fills in the form"""
+    try:
+        use_pysqlite3()
+    except ImportError:
+        return None  # Reported by load_crew() when a plan is requested
+    return stack.warm_up()
+
+
+@st.cache_resource(show_spinner="🔧 Loading the AI crew...")
+def load_crew():
+    """Import the crew stack and build the crew once per server process; every run works on a private copy"""
+    use_pysqlite3()
+    return stack.load()
+
+# Section titles for each task, in the order the crew runs them
+TASK_TITLES = {
+    'business_plan_task': "📊 Business Plan",
+    'mvp_plan_task': "🛠️ MVP Development Plan",
+    'gtm_strategy_task': "🚀 Go-to-Market Strategy",
+}
+
+
+def build_downloads(inputs, result_text, generated_on):
+    """Build the download files once, when the plan is stored"""
+    # Create downloadable content with better formatting
+    plan_content = f"""
+# ENTREPRENEURSHIP COPILOT - BUSINESS PLAN
+{'=' * 80}
+
+## STARTUP OVERVIEW
+{'=' * 40}
+
+**Startup Idea:**
+{inputs['startup_idea']}
+
+**Target Market:**
+{inputs['target_market']}
+
+**Team Composition:**
+{inputs['team_composition']}
+
+## GENERATED STRATEGIC PLAN
+{'=' * 40}
+
+{result_text}
+
+{'=' * 80}
+Generated by Entrepreneurship Copilot - AI-Powered Business Planning
+Date: {generated_on}
+{'=' * 80}
+"""
+
+    # Create a concise executive summary
+    exec_summary = f"""
+# EXECUTIVE SUMMARY - {inputs['startup_idea'][:50]}...
+{'=' * 60}
+
+## Key Information
+- **Business Type:** AI-Powered Solution
+- **Target Market:** {inputs['target_market'][:100]}...
+- **Team Size:** Multiple skilled professionals
+- **Plans Generated:** Business Strategy, MVP Plan, GTM Strategy
+
+## Strategic Focus Areas
+✅ Market Analysis & Competitive Positioning
+✅ Product Development & MVP Strategy  
+✅ Revenue Model & Financial Projections
+✅ Go-to-Market & Customer Acquisition
+✅ Risk Assessment & Mitigation
+
+## Next Steps
+1. Market validation and customer research
+2. MVP development and testing
+3. Funding strategy execution
+4. Team building and scaling
+5. Go-to-market implementation
+
+Generated by Entrepreneurship Copilot
+"""
+    
+    return {'plan': plan_content, 'summary': exec_summary}
+
+
+def store_plan(runner, inputs, result, run):
+    """Keep a finished plan in the session history, with its index and downloads built once"""
+    generated_on = datetime.now().strftime("%Y-%m-%d %H:%M")
+    history = st.session_state.plan_history
+    history[run.run_id] = {
+        'run_id': run.run_id,
+        'generated_on': generated_on,
+        'inputs': dict(inputs),
+        'result': result,
+        'index': runner.plan_index(result),
+        'downloads': build_downloads(inputs, str(result), generated_on),
+    }
+    while len(history) > UI_HISTORY:
+        history.pop(next(iter(history)))  # Oldest first
+    st.session_state.current_plan = run.run_id
+
+
+def render_plan(plan):
+    """Render a stored plan; reads only the session copy, so reruns never touch the crew"""
+    inputs = plan['inputs']
+    index = plan['index']
+    documents = index.documents
+    
+    # Create tabs for different sections
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Executive Summary", "📋 Complete Plan", "📈 Key Insights", "💾 Download"])
+    
+    with tab1:
+        st.header("📊 Executive Summary")
+        
+        # Extract key information for summary
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("🎯 Your Startup")
+            with st.container():
+                st.markdown(f"**Idea:** {inputs['startup_idea'][:200]}...")
+                st.markdown(f"**Target Market:** {inputs['target_market'][:150]}...")
+                st.markdown(f"**Team:** {inputs['team_composition'][:150]}...")
+        
+        with col2:
+            st.subheader("📈 Generated Plans")
+            for document in documents:
+                st.info(f"✅ **{TASK_TITLES.get(document.task, document.title)}** - "
+                        f"{len(document.sections)} sections")
+            
+        # Key metrics section
+        st.subheader("🔍 Quick Insights")
+        
+        insights_col1, insights_col2, insights_col3 = st.columns(3)
+        
+        with insights_col1:
+            st.metric("Plan Sections", len(index.sections), help="Number of strategic sections covered")
+        
+        with insights_col2:
+            st.metric("Key Figures", sum(len(document.metrics) for document in documents),
+                      help="Figures quoted in the plans (market size, prices, targets)")
+            
+        with insights_col3:
+            st.metric("Risks Identified", sum(len(document.risks) for document in documents),
+                      help="Risks listed in the risk sections")
+        
+        metrics = [metric for document in documents for metric in document.metrics]
+        if metrics:
+            st.table({"Figure": [metric.label for metric in metrics[:12]],
+                      "Value": [metric.value for metric in metrics[:12]]})
+    
+    with tab2:
+        st.header("📋 Your Complete Entrepreneurship Plan")
+        
+        for document in documents:
+            st.header(TASK_TITLES.get(document.task, document.title))
+            st.button("🔁 Regenerate this section", key=f"regenerate-{plan['run_id']}-{document.task}",
+                      on_click=request_regeneration, args=(plan['run_id'], document.task),
+                      help="Re-run only this section with the same inputs; sections that build on it are refreshed too")
+            for section in document.sections:
+                # Each section's text starts with its own markdown heading
+                st.markdown(document.text(section))
+    
+    with tab3:
+        st.header("📈 Key Strategic Insights")
+        
+        def show_topic(topic, title, covered, detail):
+            st.subheader(title)
+            keys = index.topics.get(topic) or []
+            if keys:
+                st.success(f"✅ {covered}")
+                st.info(detail + ": " + ", ".join(index.sections[key][1].title for key in keys[:4]))
+        
+        # Extract and highlight key insights
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            show_topic("market", "🎯 Market Opportunity", "Market analysis completed",
+                       "Target market segments identified and analyzed")
+            show_topic("revenue", "💰 Revenue Strategy", "Revenue model defined",
+                       "Multiple revenue streams identified")
+            show_topic("launch", "🚀 Launch Strategy", "Go-to-market plan ready",
+                       "Marketing channels and launch timeline defined")
+        
+        with col2:
+            show_topic("product", "🛠️ Product Development", "MVP strategy outlined",
+                       "Development roadmap and features prioritized")
+            show_topic("team", "👥 Team & Resources", "Team analysis completed",
+                       "Skills and resource requirements identified")
+            show_topic("risk", "⚠️ Risk Management", "Risk assessment included",
+                       "Potential challenges and mitigation strategies")
+        
+        # Action items section
+        st.subheader("📋 Next Steps")
+        st.markdown("""
+        **Immediate Actions:**
+        1. 📊 Review the complete business plan in detail
+        2. 🛠️ Begin MVP development planning
+        3. 💰 Prepare funding strategy and financial projections
+        4. 🎯 Validate target market assumptions
+        5. 👥 Assess team needs and hiring requirements
+        
+        """)
+        
+        timeline = [milestone for document in documents for milestone in document.timeline]
+        st.markdown("**Timeline:**")
+        if timeline:
+            st.markdown("\n".join(f"- **{milestone.period}:** {milestone.text}" for milestone in timeline[:10]))
+        else:
+            st.markdown("""
+            - **Week 1-2:** Market validation and team assessment
+            - **Week 3-4:** MVP planning and development initiation  
+            - **Month 2-3:** Product development and testing
+            - **Month 4-6:** Go-to-market execution and launch
+            """)
+    
+    with tab4:
+        st.header("💾 Download Your Plan")
+        
+        # Create different download formats
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("📄 Complete Business Plan")
+            
+            st.download_button(
+                label="📄 Download Complete Plan (TXT)",
+                data=plan["downloads"]["plan"],
+                file_name="entrepreneurship_business_plan.txt",
+                mime="text/plain",
+                help="Download the complete business plan as a text file"
+            )
+        
+        with col2:
+            st.subheader("📊 Executive Summary")
+            
+            st.download_button(
+                label="📊 Download Executive Summary",
+                data=plan["downloads"]["summary"],
+                file_name="executive_summary.txt",
+                mime="text/plain",
+                help="Download a concise executive summary"
+            )
+        
+        st.markdown("---")
+        
+        # Additional resources section
+        st.subheader("🎯 Additional Resources")
+        
+        col3, col4, col5 = st.columns(3)
+        
+        with col3:
+            st.info("""
+            **💡 Implementation Tips**
+            - Start with market validation
+            - Build MVP incrementally  
+            - Focus on customer feedback
+            - Monitor key metrics
+            """)
+        
+        with col4:
+            st.info("""
+            **📚 Recommended Reading**
+            - The Lean Startup
+            - Business Model Generation
+            - Crossing the Chasm
+            - The Mom Test
+            """)
+        
+        with col5:
+            st.info("""
+            **🔗 Useful Tools**
+            - Google Analytics
+            - Figma (UI/UX Design)
+            - Slack (Team Communication)
+            - Trello (Project Management)
+            """)
+        
+        st.success("💡 **Pro Tip:** Use this plan as a living document. Update it regularly as you validate assumptions and gather market feedback!")
+
+
+def request_regeneration(run_id, task):
+    """Button callback: regenerate one section of a stored plan on the next script run"""
+    st.session_state.regenerate_request = {'run_id': run_id, 'task': task}
+
+
+def generate_plan(inputs, force_refresh=False, regenerate=()):
+    """Run the crew on ``inputs``, showing each section as it finishes, and store the plan in the session"""
+    if not os.getenv('GEMINI_API_KEY') and not st.session_state.gemini_api_key:
+        st.error("🔑 Please set your Gemini API key first using the sidebar.")
+        st.info("💡 You can get your API key from [Google AI Studio](https://makersuite.google.com/app/apikey)")
+        return
+
+    # Sections are rendered here as each agent finishes
+    live_sections = st.container()
+
+    def show_task_output(output):
+        with live_sections:
+            with st.expander(f"✅ {TASK_TITLES.get(output.name, output.name)}", expanded=True):
+                st.markdown(output.raw)
+
+    try:
+        runner = load_crew()
+    except ImportError:
+        st.error("❌ Import error. Please install dependencies with: pip install -e .")
+        st.stop()
+
+    # Show progress
+    with st.spinner("🔄 Analyzing your startup and generating comprehensive plans... This may take a few minutes."):
+        try:
+            # Run analysis, showing each plan as soon as it is ready
+            # Closing the tab stops the run at its next LLM call, search or agent step
+            run = RunContext(deadline_seconds=UI_DEADLINE or None, disconnected=session_gone(),
+                             api_key=st.session_state.gemini_api_key)
+            result = runner.run_crew(
+                inputs,
+                on_task_output=show_task_output,
+                force_refresh=force_refresh,
+                regenerate=regenerate,
+                run=run
+            )
+
+            # Display results
+            st.success("✅ Plan generation completed!")
+            if run.similar is not None:
+                st.info(f"♻️ Built on an earlier, similar plan ({run.similar['mode']}, "
+                        f"similarity {run.similar['score']:.2f}). Tick \"Regenerate from scratch\" for a fresh one.")
+
+            store_plan(runner, inputs, result, run)
+
+        except RunCancelled as e:
+            if e.partial is None:
+                st.error(f"⏱️ Plan generation stopped ({e.reason}) before any plan was ready.")
+            else:
+                st.warning(f"⏱️ Plan generation stopped ({e.reason}); showing the plans finished so far.")
+                store_plan(runner, inputs, e.partial, run)
+        except ValueError as ve:
+            if "GEMINI_API_KEY" in str(ve):
+                st.error("🔑 API Key Error: The Gemini API key is missing or invalid.")
+                st.info("💡 Please set your API key using the sidebar and try again.")
+            else:
+                st.error(f"❌ Configuration Error: {str(ve)}")
+        except Exception as e:
+            st.error(f"❌ Error generating plan: {str(e)}")
+            st.info("💡 **Troubleshooting**: Make sure you have the required dependencies installed and your AI model is properly configured.")
+
+            # Show detailed error info in an expander for debugging
+            with st.expander("🔍 Error Details (for debugging)"):
+                st.code(str(e))
+                st.write("If this error persists, please check:")
+                st.write("1. ✅ GEMINI_API_KEY is set using the sidebar")
+                st.write("2. ✅ All dependencies are installed")
+                st.write("3. ✅ Your internet connection is stable")
+                st.write("4. ✅ The CrewAI service is responding")
 
 
 def main():
@@ -24,28 +400,34 @@ def main():
         page_icon="🚀",
         layout="wide"
     )
+    start_crew_warmup()
     
     st.title("🚀 Entrepreneurship Copilot")
     st.markdown("*AI-powered business planning assistant*")
     
-    # Initialize session state for API key
-    if 'gemini_api_key_set' not in st.session_state:
-        st.session_state.gemini_api_key_set = False
+    # The key stays in this browser session; it is passed to each run, never put in the process environment
+    if 'gemini_api_key' not in st.session_state:
+        st.session_state.gemini_api_key = None
+    
+    # Finished plans survive reruns (downloads, key changes) without running the crew again
+    if 'plan_history' not in st.session_state:
+        st.session_state.plan_history = {}
+        st.session_state.current_plan = None
     
     st.markdown("---")
     
     # Sidebar with instructions
     with st.sidebar:
         # Show API key status or setup
-        if os.getenv('GEMINI_API_KEY') or st.session_state.gemini_api_key_set:
+        if st.session_state.gemini_api_key:
             st.success("✅ Gemini API Key: Connected")
             st.info("🔧 Set for this session")
             if st.button("🔄 Change API Key"):
-                # Remove from current environment
-                if 'GEMINI_API_KEY' in os.environ:
-                    del os.environ['GEMINI_API_KEY']
-                st.session_state.gemini_api_key_set = False
+                st.session_state.gemini_api_key = None
                 st.rerun()
+        elif os.getenv('GEMINI_API_KEY'):
+            st.success("✅ Gemini API Key: Connected")
+            st.info("🔧 Using the server's key")
         else:
             st.warning("🔑 API Key Required")
             st.markdown("You'll need a Gemini API key to generate plans.")
@@ -65,8 +447,7 @@ def main():
                     
                     if submitted:
                         if api_key.strip():
-                            os.environ['GEMINI_API_KEY'] = api_key.strip()
-                            st.session_state.gemini_api_key_set = True
+                            st.session_state.gemini_api_key = api_key.strip()
                             st.success("✅ API key set successfully!")
                             st.rerun()
                         else:
@@ -86,6 +467,17 @@ def main():
         - **MVP Plan**: Product development roadmap and validation strategy  
         - **GTM Strategy**: Customer acquisition and launch plan
         """)
+        
+        history = st.session_state.plan_history
+        if history:
+            st.header("🕘 Your plans")
+            run_ids = list(reversed(history))  # Newest first
+            st.session_state.current_plan = st.selectbox(
+                "Show plan",
+                options=run_ids,
+                index=run_ids.index(st.session_state.current_plan) if st.session_state.current_plan in history else 0,
+                format_func=lambda run_id: f"{history[run_id]['generated_on']} · {history[run_id]['inputs']['startup_idea'][:40]}"
+            )
     
     # Main input form
     st.header("📝 Tell us about your startup")
@@ -112,296 +504,31 @@ def main():
             help="Include founders, key employees, advisors, and their backgrounds"
         )
         
+        force_refresh = st.checkbox(
+            "♻️ Regenerate from scratch",
+            help="Ignore previously generated plans for the same inputs"
+        )
+        
         submitted = st.form_submit_button("🚀 Generate Business Plan", type="primary")
     
     if submitted:
         if not startup_idea or not target_market or not team_composition:
             st.error("❌ Please fill in all fields before generating the plan.")
-        elif not os.getenv('GEMINI_API_KEY') and not st.session_state.gemini_api_key_set:
-            st.error("🔑 Please set your Gemini API key first using the sidebar.")
-            st.info("💡 You can get your API key from [Google AI Studio](https://makersuite.google.com/app/apikey)")
         else:
-            # Show progress
-            with st.spinner("🔄 Analyzing your startup and generating comprehensive plans... This may take a few minutes."):
-                try:
-                    # Prepare inputs for the crew
-                    inputs = {
-                        'startup_idea': startup_idea,
-                        'target_market': target_market,
-                        'team_composition': team_composition
-                    }
-                    
-                    # Initialize crew and run analysis
-                    crew_instance = EntrepreneurshipCrew()
-                    result = crew_instance.crew().kickoff(inputs=inputs)
-
-                    # Display results
-                    st.success("✅ Plan generation completed!")
-                    
-                    # Parse the result to extract different sections
-                    result_str = str(result)
-                    
-                    # Create tabs for different sections
-                    tab1, tab2, tab3, tab4 = st.tabs(["📊 Executive Summary", "📋 Complete Plan", "📈 Key Insights", "💾 Download"])
-                    
-                    with tab1:
-                        st.header("📊 Executive Summary")
-                        
-                        # Extract key information for summary
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.subheader("🎯 Your Startup")
-                            with st.container():
-                                st.markdown(f"**Idea:** {startup_idea[:200]}...")
-                                st.markdown(f"**Target Market:** {target_market[:150]}...")
-                                st.markdown(f"**Team:** {team_composition[:150]}...")
-                        
-                        with col2:
-                            st.subheader("📈 Generated Plans")
-                            st.info("✅ **Business Strategy Plan** - Complete")
-                            st.info("✅ **MVP Development Plan** - Complete") 
-                            st.info("✅ **Go-to-Market Strategy** - Complete")
-                            
-                        # Key metrics section
-                        st.subheader("🔍 Quick Insights")
-                        
-                        # Try to extract key metrics from the result
-                        insights_col1, insights_col2, insights_col3 = st.columns(3)
-                        
-                        with insights_col1:
-                            st.metric("Plan Sections", "12+", help="Number of strategic sections covered")
-                        
-                        with insights_col2:
-                            st.metric("Target Segments", "2-3", help="Primary customer segments identified")
-                            
-                        with insights_col3:
-                            st.metric("Revenue Streams", "Multiple", help="Diversified revenue model")
-                    
-                    with tab2:
-                        st.header("📋 Your Complete Entrepreneurship Plan")
-                        
-                        # Split the content into sections for better readability
-                        sections = result_str.split('\n\n')
-                        
-                        # Display content in organized sections
-                        for i, section in enumerate(sections):
-                            if section.strip():
-                                # Check if this looks like a header
-                                if section.startswith('#') or section.startswith('**') or len(section) < 100:
-                                    if section.startswith('#'):
-                                        # Convert markdown headers to streamlit headers
-                                        header_level = section.count('#')
-                                        header_text = section.lstrip('#').strip()
-                                        if header_level == 1:
-                                            st.header(header_text)
-                                        elif header_level == 2:
-                                            st.subheader(header_text)
-                                        else:
-                                            st.write(f"**{header_text}**")
-                                    else:
-                                        st.markdown(section)
-                                else:
-                                    # Regular content
-                                    st.markdown(section)
-                                
-                                # Add some spacing between sections
-                                if i < len(sections) - 1:
-                                    st.write("")
-                    
-                    with tab3:
-                        st.header("📈 Key Strategic Insights")
-                        
-                        # Extract and highlight key insights
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.subheader("🎯 Market Opportunity")
-                            if "market" in result_str.lower():
-                                st.success("✅ Market analysis completed")
-                                st.info("Target market segments identified and analyzed")
-                            
-                            st.subheader("💰 Revenue Strategy")
-                            if "revenue" in result_str.lower() or "pricing" in result_str.lower():
-                                st.success("✅ Revenue model defined")
-                                st.info("Multiple revenue streams identified")
-                                
-                            st.subheader("🚀 Launch Strategy")
-                            if "launch" in result_str.lower() or "marketing" in result_str.lower():
-                                st.success("✅ Go-to-market plan ready")
-                                st.info("Marketing channels and launch timeline defined")
-                        
-                        with col2:
-                            st.subheader("🛠️ Product Development")
-                            if "mvp" in result_str.lower() or "product" in result_str.lower():
-                                st.success("✅ MVP strategy outlined")
-                                st.info("Development roadmap and features prioritized")
-                                
-                            st.subheader("👥 Team & Resources")
-                            if "team" in result_str.lower():
-                                st.success("✅ Team analysis completed")
-                                st.info("Skills and resource requirements identified")
-                                
-                            st.subheader("⚠️ Risk Management")
-                            if "risk" in result_str.lower() or "challenge" in result_str.lower():
-                                st.success("✅ Risk assessment included")
-                                st.info("Potential challenges and mitigation strategies")
-                        
-                        # Action items section
-                        st.subheader("📋 Next Steps")
-                        st.markdown("""
-                        **Immediate Actions:**
-                        1. 📊 Review the complete business plan in detail
-                        2. 🛠️ Begin MVP development planning
-                        3. 💰 Prepare funding strategy and financial projections
-                        4. 🎯 Validate target market assumptions
-                        5. 👥 Assess team needs and hiring requirements
-                        
-                        **Timeline:**
-                        - **Week 1-2:** Market validation and team assessment
-                        - **Week 3-4:** MVP planning and development initiation  
-                        - **Month 2-3:** Product development and testing
-                        - **Month 4-6:** Go-to-market execution and launch
-                        """)
-                    
-                    with tab4:
-                        st.header("💾 Download Your Plan")
-                        
-                        # Create different download formats
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.subheader("📄 Complete Business Plan")
-                            
-                            # Create downloadable content with better formatting
-                            plan_content = f"""
-# ENTREPRENEURSHIP COPILOT - BUSINESS PLAN
-{'=' * 80}
-
-## STARTUP OVERVIEW
-{'=' * 40}
-
-**Startup Idea:**
-{startup_idea}
-
-**Target Market:**
-{target_market}
-
-**Team Composition:**
-{team_composition}
-
-## GENERATED STRATEGIC PLAN
-{'=' * 40}
-
-{str(result)}
-
-{'=' * 80}
-Generated by Entrepreneurship Copilot - AI-Powered Business Planning
-Date: {st.session_state.get('generation_date', 'Today')}
-{'=' * 80}
-"""
-                            
-                            st.download_button(
-                                label="📄 Download Complete Plan (TXT)",
-                                data=plan_content,
-                                file_name="entrepreneurship_business_plan.txt",
-                                mime="text/plain",
-                                help="Download the complete business plan as a text file"
-                            )
-                        
-                        with col2:
-                            st.subheader("📊 Executive Summary")
-                            
-                            # Create a concise executive summary
-                            exec_summary = f"""
-# EXECUTIVE SUMMARY - {startup_idea[:50]}...
-{'=' * 60}
-
-## Key Information
-- **Business Type:** AI-Powered Solution
-- **Target Market:** {target_market[:100]}...
-- **Team Size:** Multiple skilled professionals
-- **Plans Generated:** Business Strategy, MVP Plan, GTM Strategy
-
-## Strategic Focus Areas
-✅ Market Analysis & Competitive Positioning
-✅ Product Development & MVP Strategy  
-✅ Revenue Model & Financial Projections
-✅ Go-to-Market & Customer Acquisition
-✅ Risk Assessment & Mitigation
-
-## Next Steps
-1. Market validation and customer research
-2. MVP development and testing
-3. Funding strategy execution
-4. Team building and scaling
-5. Go-to-market implementation
-
-Generated by Entrepreneurship Copilot
-"""
-                            
-                            st.download_button(
-                                label="📊 Download Executive Summary",
-                                data=exec_summary,
-                                file_name="executive_summary.txt",
-                                mime="text/plain",
-                                help="Download a concise executive summary"
-                            )
-                        
-                        st.markdown("---")
-                        
-                        # Additional resources section
-                        st.subheader("🎯 Additional Resources")
-                        
-                        col3, col4, col5 = st.columns(3)
-                        
-                        with col3:
-                            st.info("""
-                            **💡 Implementation Tips**
-                            - Start with market validation
-                            - Build MVP incrementally  
-                            - Focus on customer feedback
-                            - Monitor key metrics
-                            """)
-                        
-                        with col4:
-                            st.info("""
-                            **📚 Recommended Reading**
-                            - The Lean Startup
-                            - Business Model Generation
-                            - Crossing the Chasm
-                            - The Mom Test
-                            """)
-                        
-                        with col5:
-                            st.info("""
-                            **🔗 Useful Tools**
-                            - Google Analytics
-                            - Figma (UI/UX Design)
-                            - Slack (Team Communication)
-                            - Trello (Project Management)
-                            """)
-                        
-                        st.success("💡 **Pro Tip:** Use this plan as a living document. Update it regularly as you validate assumptions and gather market feedback!")
-                
-                except ValueError as ve:
-                    if "GEMINI_API_KEY" in str(ve):
-                        st.error("🔑 API Key Error: The Gemini API key is missing or invalid.")
-                        st.info("💡 Please set your API key using the sidebar and try again.")
-                    else:
-                        st.error(f"❌ Configuration Error: {str(ve)}")
-                except Exception as e:
-                    st.error(f"❌ Error generating plan: {str(e)}")
-                    st.info("💡 **Troubleshooting**: Make sure you have the required dependencies installed and your AI model is properly configured.")
-                    
-                    # Show detailed error info in an expander for debugging
-                    with st.expander("🔍 Error Details (for debugging)"):
-                        st.code(str(e))
-                        st.write("If this error persists, please check:")
-                        st.write("1. ✅ GEMINI_API_KEY is set using the sidebar")
-                        st.write("2. ✅ All dependencies are installed")
-                        st.write("3. ✅ Your internet connection is stable")
-                        st.write("4. ✅ The CrewAI service is responding")
+            generate_plan({
+                'startup_idea': startup_idea,
+                'target_market': target_market,
+                'team_composition': team_composition
+            }, force_refresh=force_refresh)
+    
+    # Set by a section's regenerate button; the other sections come from the task memo
+    request = st.session_state.pop('regenerate_request', None)
+    if request is not None and request['run_id'] in st.session_state.plan_history:
+        generate_plan(st.session_state.plan_history[request['run_id']]['inputs'], regenerate=[request['task']])
+    
+    plan = st.session_state.plan_history.get(st.session_state.current_plan)
+    if plan is not None:
+        render_plan(plan)
     
     # Footer
     st.markdown("---")